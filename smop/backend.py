@@ -36,8 +36,62 @@ optable = {
     "./=" : "/",
     }
 
-def backend(t,*args,**kwargs):
-    return t._backend(level=1,*args,**kwargs)
+def backend(t):
+    """Returns the generated code of t as a string"""
+    fp = chunks()
+    emit(t,fp)
+    return fp.getvalue()
+
+def emit(t,fp,level=1):
+    """Writes the generated code of t to fp"""
+    t._emit(writer(fp.write,level))
+
+class chunks(object):
+    """
+    In-memory file for emit().  Small strings are joined into
+    chunks of about chunksize characters as they come, because a
+    list of all of them would take several times the size of the
+    output.
+    """
+    chunksize = 16384
+
+    def __init__(self):
+        self.chunks = []
+        self.pending = []
+        self.size = 0
+
+    def write(self,s):
+        self.pending.append(s)
+        self.size += len(s)
+        if self.size >= self.chunksize:
+            self.chunks.append("".join(self.pending))
+            self.pending = []
+            self.size = 0
+
+    def getvalue(self):
+        self.chunks.append("".join(self.pending))
+        self.pending = []
+        self.size = 0
+        return "".join(self.chunks)
+
+class writer(object):
+    """
+    Output stream of the backend.  Statements write themselves to
+    it as the tree is walked, rather than returning strings which
+    are joined at each level, so the output is never assembled in
+    pieces.  Tracks the indentation level of the statements.
+    """
+    def __init__(self,write,level=1):
+        self.write = write
+        self.level = level
+
+    def newline(self):
+        self.write("\n"+indent*self.level)
+
+    def block(self,stmt_list):
+        self.level += 1
+        stmt_list._emit(self)
+        self.level -= 1
 
 
 # Sometimes user's variable names in the matlab code collide with Python
@@ -78,11 +132,43 @@ def _backend(self,level=0):
         return "(%s+%s)" % (self.args[0]._backend(),
                             self.args[1]._backend())
 
+def bind_end(self):
+    """
+    The parser leaves a placeholder in the args of end.  Replace
+    it, in the subscripts of array reference self, with the array
+    and the dimension, so that end is emitted as A.size or as
+    A.shape[k] instead of end().  Subscripts nested in subscripts
+    are bound again when they are emitted, which is later.
+    """
+    for k,t in enumerate(self.args):
+        for u in node.preorder(t,node.expr):
+            if u.__class__ is node.expr and u.op == "end":
+                if len(self.args) == 1:
+                    u.args = node.expr_list([self.func_expr])
+                else:
+                    u.args = node.expr_list([self.func_expr,
+                                             node.number(k)])
+
+def subscripts(args):
+    """
+    Colon expressions in array subscripts are emitted as python
+    slices, which matlabarray maps to basic indexing.  Elsewhere
+    they are arange() calls.
+    """
+    s = []
+    for t in args:
+        if t.__class__ is node.expr and t.op == ":":
+            s.append(":".join(u._backend() for u in t.args) or ":")
+        else:
+            s.append(t._backend())
+    return ",".join(s)
+
 @extend(node.arrayref)
 def _backend(self,level=0):
+    bind_end(self)
     fmt = "%s[%s]"
     return fmt % (self.func_expr._backend(),
-                       self.args._backend())
+                       subscripts(self.args))
 
 @extend(node.break_stmt)
 def _backend(self,level=0):
@@ -100,8 +186,9 @@ def _backend(self,level=0):
 
 @extend(node.cellarrayref)
 def _backend(self,level=0):
+    bind_end(self)
     return "%s[%s]" % (self.func_expr._backend(),
-                       self.args._backend())
+                       subscripts(self.args))
 
 @extend(node.comment_stmt)
 def _backend(self,level=0):
@@ -159,11 +246,13 @@ def _backend(self,level=0):
         return "arange(%s)" % self.args._backend()
     
     if self.op == "end":
-#        if self.args:
-#            return "%s.shape[%s]" % (self.args[0]._backend(),
-#                                     self.args[1]._backend())
-#        else:
+        # see bind_end
+        if self.args[0].__class__ is node.number:
             return "end()"
+        if len(self.args) == 1:
+            return "%s.size" % self.args[0]._backend()
+        return "%s.shape[%s]" % (self.args[0]._backend(),
+                                 self.args[1]._backend())
 
     if self.op == ".":
         #import pdb; pdb.set_trace()
@@ -182,6 +271,8 @@ def _backend(self,level=0):
 #         return "[%s]" % ",".join([t._backend() for t in self.args])
     if self.op == "parens":
         return "(%s)" % self.args[0]._backend()
+    if self.op == "int": # made by prealloc.py
+        return "int(%s)" % self.args[0]._backend()
 #    if self.op == "[]":
 #        return "[%s]" % self.args._backend()
     if not self.args:
@@ -207,32 +298,55 @@ def _backend(self,level=0):
 def _backend(self,level=0):
     return self.expr._backend()
 
-@extend(node.for_stmt)
-def _backend(self,level=0):
-    fmt = "for %s in %s.reshape(-1):%s"
-    return fmt % (self.ident._backend(),
-                  self.expr._backend(),
-                  self.stmt_list._backend(level+1))
+def loop_range(self):
+    """
+    The iterable of for_stmt.  A counted loop, over lo:hi or
+    lo:step:hi where lo and step are positive integer literals, see
+    infer.py, iterates over a range, whose ints are made numpy ints,
+    as are those of arange -- 1/(k-1) gives inf, not an exception.
+    Otherwise, over the elements of the array, in column order.
+    """
+    if self.ident.kind != "index":
+        return "%s.reshape(-1)" % self.expr._backend()
+    lo, hi = self.expr.args[:2]
+    if hi.__class__ is node.number and type(hi.value) is int:
+        stop = str(hi.value + 1)
+    else:
+        stop = "int(%s) + 1" % hi._backend()
+    if len(self.expr.args) == 2:
+        return "map(np.int64,range(%s,%s))" % (lo._backend(), stop)
+    return "map(np.int64,range(%s,%s,%s))" % (lo._backend(), stop,
+                                              self.expr.args[2]._backend())
+
 
 
 @extend(node.func_stmt)
 def _backend(self,level=0):
-    self.args.append(node.ident("*args"))
+    # Extra arguments go to *varargin if the function declares it,
+    # and nargout, passed by the callers, to **kwargs.  Only the
+    # functions which use nargin are decorated -- @function passes
+    # it in kwargs.
+    if self.args and self.args[-1].name == "varargin":
+        self.args[-1] = node.ident("*varargin")
+    else:
+        self.args.append(node.ident("*args"))
     self.args.append(node.ident("**kwargs"))
-    s = """
-@function
-def %s(%s):
-    varargin = %s.varargin
-    nargin = %s.nargin
-""" % (self.ident._backend(),
-       self.args._backend(),
-       self.ident._backend(),
-       self.ident._backend())
+    s = "\n"
+    if self.use_nargin:
+        s += "@function\n"
+    s += "def %s(%s):\n" % (self.ident._backend(),
+                            self.args._backend())
+    if self.use_nargin:
+        s += "    nargin = kwargs[\"nargin\"]\n"
+    if self.use_varargin:
+        s += "    varargin = cellarray(%s)\n" % self.args[-2].name[1:]
     return s
 
 @extend(node.funcall)
 def _backend(self,level=0):
     #import pdb; pdb.set_trace()
+    if self.func_expr.__class__ is node.ident and self.func_expr.defs:
+        bind_end(self) # a variable, so it is an array reference
     if not self.nargout or self.nargout == 1:
         return "%s(%s)" % (self.func_expr._backend(),
                            self.args._backend())
@@ -258,17 +372,6 @@ def _backend(self,level=0):
                           self.init._backend())
     return self.name
 
-@extend(node.if_stmt)
-def _backend(self,level=0):
-    s = "if %s:%s" % (self.cond_expr._backend(),
-                      self.then_stmt._backend(level+1))
-    if self.else_stmt:
-        # Eech. This should have been handled in the parser.
-        if self.else_stmt.__class__ == node.if_stmt:
-            self.else_stmt = node.stmt_list([self.else_stmt])
-        s += "\n"+indent*level
-        s += "else:%s" % self.else_stmt._backend(level+1)
-    return s
 
 @extend(node.lambda_expr)
 def _backend(self,level=0):
@@ -294,11 +397,21 @@ def _backend(self,level=0):
                                            self.ret.args[1].args[0]._backend(),
                                            self.args._backend())
         except:
-            s += "%s%s = copy(%s)" % (self.ret.args[0]._backend(),
-                                       self.ret.args[1]._backend(),
-                                       self.args._backend())
-    elif (self.ret.__class__ is node.ident and
-        self.args.__class__ is node.ident):
+            if self.copy is False:
+                fmt = "%s%s = %s"
+            else:
+                fmt = "%s%s = copy(%s)"
+            s += fmt % (self.ret.args[0]._backend(),
+                        self.ret.args[1]._backend(),
+                        self.args._backend())
+    elif (self.ret.__class__ is node.ident and self.copy is not False and
+          (self.args.__class__ in (node.ident,node.arrayref) or
+           self.args.__class__ is node.funcall and
+           self.args.func_expr.__class__ is node.ident and
+           self.args.func_expr.defs)):
+        # Matlab assignment copies the value.  A subscripted
+        # value A(B) may be a view of A, so it is copied too,
+        # unless copies.py found that no one stores into either.
         s += "%s=copy(%s)" % (self.ret._backend(),
                               self.args._backend())
     else:
@@ -353,16 +466,6 @@ def _backend(self,level=0):
         return "return %s" % self.ret._backend()
 
 
-@extend(node.stmt_list)
-def _backend(self,level=0):
-    for t in self:
-        if not isinstance(t,(node.null_stmt,
-                             node.comment_stmt)):
-            break
-    else:
-        self.append(node.pass_stmt())
-    sep = "\n"+indent*level
-    return sep+sep.join([t._backend(level) for t in self])
 
 @extend(node.string)
 def _backend(self,level=0):
@@ -380,17 +483,55 @@ def _backend(self,level=0):
 def _backend(self,level=0):
     return "%s.T" % self.args[0]._backend()
 
-@extend(node.try_catch)
-def _backend(self,level=0):
-    fmt = "try:%s\n%sfinally:%s"
-    return fmt % (self.try_stmt._backend(level+1),
-                  indent*level,
-                  self.finally_stmt._backend(level+1))
 
 
-@extend(node.while_stmt)
-def _backend(self,level=0):
-    fmt = "while %s:\n%s\n"
-    return fmt % (self.cond_expr._backend(),
-                  self.stmt_list._backend(level+1))
 
+# Statements which contain other statements are written by _emit,
+# and the rest by _backend, which returns their text.
+
+@extend(node.node)
+def _emit(self,out):
+    out.write(self._backend(out.level))
+
+@extend(node.for_stmt)
+def _emit(self,out):
+    out.write("for %s in %s:" % (self.ident._backend(),
+                                 loop_range(self)))
+    out.block(self.stmt_list)
+
+@extend(node.if_stmt)
+def _emit(self,out):
+    out.write("if %s:" % self.cond_expr._backend())
+    out.block(self.then_stmt)
+    if self.else_stmt:
+        # Eech. This should have been handled in the parser.
+        if self.else_stmt.__class__ == node.if_stmt:
+            self.else_stmt = node.stmt_list([self.else_stmt])
+        out.newline()
+        out.write("else:")
+        out.block(self.else_stmt)
+
+@extend(node.stmt_list)
+def _emit(self,out):
+    for t in self:
+        if not isinstance(t,(node.null_stmt,
+                             node.comment_stmt)):
+            break
+    else:
+        self.append(node.pass_stmt())
+    for t in self:
+        out.newline()
+        t._emit(out)
+
+@extend(node.try_catch)
+def _emit(self,out):
+    out.write("try:")
+    out.block(self.try_stmt)
+    out.write("\n%sfinally:" % (indent*out.level))
+    out.block(self.finally_stmt)
+
+@extend(node.while_stmt)
+def _emit(self,out):
+    out.write("while %s:\n" % self.cond_expr._backend())
+    out.block(self.stmt_list)
+    out.write("\n")
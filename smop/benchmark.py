@@ -0,0 +1,517 @@
+# SMOP compiler -- Simple Matlab/Octave to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Benchmarks of smop itself and of its runtime library.
+
+    $ python -m smop.benchmark startup
+    $ python -m smop.benchmark --record startup.json startup
+    $ python -m smop.benchmark memory [FILE.m ...]
+    $ python -m smop.benchmark emit [FILE.m ...]
+    $ python -m smop.benchmark index
+    $ python -m smop.benchmark corpus --baseline baseline.json
+    $ python -m smop.benchmark serve [FILE.m ...]
+
+Each subcommand prints its own table.  With --record, the results
+are also stored in a json file under the current smop version, so
+that later runs can be compared to earlier ones.
+
+The corpus subcommand generates .m files of several kinds, see
+generate(), translates them, and measures each phase of the driver,
+see timing.py.  With --baseline, the results are compared to those
+stored in a file by an earlier run, and the exit status is 1 if a
+kind of file is translated slower by more than --tolerance percent.
+
+Modules of the smop package are imported lazily, after sys.argv is
+cleared -- smop.options parses the command line on import.
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+def median(a):
+    a = sorted(a)
+    n = len(a)
+    return (a[n // 2] + a[(n - 1) // 2]) / 2.0
+
+def smop_version():
+    from . import version
+    return version.__version__
+
+def record(filename, name, results):
+    """Stores results under filename[version][name]"""
+    try:
+        with open(filename) as fp:
+            history = json.load(fp)
+    except (IOError, OSError, ValueError):
+        history = {}
+    history.setdefault(smop_version(), {})[name] = results
+    with open(filename, "w") as fp:
+        json.dump(history, fp, indent=1, sort_keys=True)
+    return history
+
+def show_history(history, name):
+    for version in sorted(history):
+        if name in history[version]:
+            print("%-12s" % version,
+                  " ".join("%s=%.1f" % kv
+                           for kv in sorted(history[version][name].items())))
+
+def time_import(stmt, repeat):
+    """Median wall time, in ms, of a fresh interpreter running stmt"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(dirname), dirname, env.get("PYTHONPATH", "")])
+    t = []
+    for i in range(repeat):
+        t0 = time.time()
+        subprocess.check_call([sys.executable, "-c", stmt], env=env)
+        t.append(time.time() - t0)
+    return median(t) * 1000
+
+def startup(args):
+    """Time to import the compiler and the runtime library, less the
+    time to start the interpreter"""
+    base = time_import("pass", args.repeat)
+    results = {}
+    for name, stmt in (("smop", "import smop.main"),
+                       ("libsmop", "import libsmop")):
+        results[name] = time_import(stmt, args.repeat) - base
+    print("interpreter %7.1f ms" % base)
+    for name in sorted(results):
+        print("%-11s %7.1f ms" % (name, results[name]))
+    return results
+
+def sample_files():
+    """The .m files which come with smop, except benchmark2.m, which
+    does not parse"""
+    return [os.path.join(dirname, f) for f in
+            ("solver.m", "fastsolver.m", "r8_random.m",
+             "benchmark5/benchmark5.m")]
+
+def memory(args):
+    """Bytes per node of the parse trees of FILE.m, after resolve.
+    The trees are copied twice, to nodes of the classes as they are,
+    and to nodes with a __dict__ each, as before the node classes
+    were given __slots__.  The copies share the fields which are not
+    nodes with the trees, so that only the nodes are counted."""
+    from . import node, parse
+    if parse.parser is None:
+        parse.parser = parse.build()
+    parse.parse("x=1;\n") # the lexer is built on first use
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    trees = parse_files(args.files or sample_files())
+    gc.collect()
+    nbytes = tracemalloc.get_traced_memory()[0] - base
+    nnodes = sum(1 for t in trees for u in node.preorder(t))
+    results = {"nodes": nnodes,
+               "bytes": nbytes,
+               "bytes_per_node": float(nbytes) / max(nnodes, 1)}
+    print("%d nodes, %d bytes, %.1f bytes per node" %
+          (nnodes, nbytes, results["bytes_per_node"]))
+    for layout in ("slots", "dict"):
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        copies = [copy_nodes(t, {}, layout == "dict") for t in trees]
+        gc.collect()
+        nbytes = tracemalloc.get_traced_memory()[0] - base
+        del copies
+        results[layout + "_bytes_per_node"] = float(nbytes) / max(nnodes, 1)
+    tracemalloc.stop()
+    results["saved_percent"] = 100 * (1 - results["slots_bytes_per_node"] /
+                                      results["dict_bytes_per_node"])
+    print("the nodes alone: %.1f bytes per node, %.1f with a __dict__ "
+          "each, %.0f%% saved by __slots__" %
+          (results["slots_bytes_per_node"], results["dict_bytes_per_node"],
+           results["saved_percent"]))
+    return results
+
+def copy_nodes(u, classes, dicts):
+    """Copy of the tree u.  With dicts, the nodes are instances of
+    subclasses of their classes which have a __dict__."""
+    from . import node
+    if not isinstance(u, node.node):
+        return u
+    cls = u.__class__
+    if cls not in classes:
+        classes[cls] = type(cls.__name__, (cls,), {}) if dicts else cls
+    fields = node.children(cls)
+    if fields is None:
+        return classes[cls](copy_nodes(v, classes, dicts) for v in u)
+    if isinstance(u, tuple):
+        return classes[cls](*u)
+    v = classes[cls].__new__(classes[cls])
+    for c in cls.__mro__:
+        for f in getattr(c, "__slots__", ()):
+            if hasattr(u, f):
+                w = getattr(u, f)
+                if f in fields:
+                    w = copy_nodes(w, classes, dicts)
+                setattr(v, f, w)
+    return v
+
+def parse_files(files):
+    """Parses and resolves files, returns the list of trees"""
+    from . import options, parse, resolve
+    trees = []
+    for options.filename in files:
+        with open(options.filename) as fp:
+            buf = fp.read()
+        t = parse.parse(buf if buf.endswith("\n") else buf + "\n")
+        resolve.resolve(t)
+        trees.append(t)
+    return trees
+
+def emit(args):
+    """Throughput and peak memory of code generation for FILE.m:
+    streamed to a file by backend.emit(), or to a string by
+    backend.backend()"""
+    from . import backend
+    files = args.files or sample_files()
+    tmp = tempfile.TemporaryFile("w+")
+    def stream(t):
+        start = tmp.tell()
+        backend.emit(t, tmp)
+        return tmp.tell() - start
+    results = {}
+    # The backend changes the tree, so each method gets fresh trees
+    for name, f in (("stream", stream),
+                    ("string", lambda t: len(backend.backend(t)))):
+        trees = parse_files(files)
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.time()
+        nbytes = sum(f(t) for t in trees)
+        t1 = time.time()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name + "_mb_per_s"] = nbytes / (t1 - t0) / 1e6
+        results[name + "_peak_kb"] = peak / 1e3
+        print("%-6s %7.2f MB/s, peak %6.0f KB" %
+              (name, results[name + "_mb_per_s"],
+               results[name + "_peak_kb"]))
+    tmp.close()
+    return results
+
+def index(args):
+    """Time per read and per write of a(i), a(i,j), a(:,j), a(i:k)
+    and a(end), where a is an N by N matlabarray"""
+    from .libsmop import end, zeros
+    env = {"a": zeros(args.size, args.size), "end": end,
+           "i": 7, "j": 5, "k": args.size // 2}
+    results = {}
+    for name, read, write in (("a(i)", "a[i]", "a[i] = 1.0"),
+                              ("a(i,j)", "a[i,j]", "a[i,j] = 1.0"),
+                              ("a(:,j)", "a[:,j]", "a[:,j] = 1.0"),
+                              ("a(i:k)", "a[i:k]", "a[i:k] = 1.0"),
+                              ("a(end)", "a[end()]", "a[end()] = 1.0")):
+        for op, stmt in (("read", read), ("write", write)):
+            t = min(timeit.repeat(stmt, globals=env, number=args.number,
+                                  repeat=args.repeat))
+            results[name + "_" + op + "_us"] = t / args.number * 1e6
+        print("%-7s read %6.2f us, write %6.2f us" %
+              (name, results[name + "_read_us"], results[name + "_write_us"]))
+    return results
+
+# Generated corpus
+
+KINDS = ("small", "huge", "deep", "matrix", "comments")
+
+def gen_expr(rng, depth):
+    r = rng.random()
+    if depth == 0 or r < 0.3:
+        return rng.choice(["x%d" % rng.randrange(8), str(rng.randrange(10)),
+                           "%.3f" % rng.random(), "y(%d)" % rng.randint(1, 9)])
+    if r < 0.45:
+        return "%s(%s)" % (rng.choice(["abs", "sqrt", "exp", "numel"]),
+                           gen_expr(rng, depth - 1))
+    return "%s %s %s" % (gen_expr(rng, depth - 1),
+                         rng.choice(["+", "-", "*", ".*", "/"]),
+                         gen_expr(rng, depth - 1))
+
+def gen_stmts(rng, n, indent, comments=False):
+    lines = []
+    for i in range(n):
+        r = rng.random()
+        if comments:
+            lines.append("%s%% %s" % (indent, " ".join(
+                rng.choice(["the", "sum", "of", "x", "loop", "value"])
+                for j in range(rng.randint(3, 12)))))
+        if r < 0.5:
+            lines.append("%sx%d = %s;" % (indent, rng.randrange(8),
+                                          gen_expr(rng, 3)))
+        elif r < 0.7:
+            lines.append("%sy(%d) = %s;" % (indent, rng.randint(1, 9),
+                                            gen_expr(rng, 2)))
+        elif r < 0.85:
+            lines.append("%sfor k=1:n" % indent)
+            lines.append("%s  y(k) = %s;" % (indent, gen_expr(rng, 2)))
+            lines.append("%send" % indent)
+        else:
+            lines.append("%sif x%d > %s" % (indent, rng.randrange(8),
+                                            gen_expr(rng, 1)))
+            lines.extend(gen_stmts(rng, 2, indent + "  ", comments))
+            lines.append("%selse" % indent)
+            lines.extend(gen_stmts(rng, 1, indent + "  ", comments))
+            lines.append("%send" % indent)
+    return lines
+
+def gen_function(rng, name, n, comments=False):
+    lines = ["function r = %s(n)" % name]
+    if comments:
+        lines.extend("%% %s: line %d of the help text" % (name, i)
+                     for i in range(20))
+    lines.append("  y = zeros(1,n);")
+    lines.extend("  x%d = %d;" % (i, i) for i in range(8))
+    lines.extend(gen_stmts(rng, n, "  ", comments))
+    lines.append("  r = x0 + y(1);")
+    return lines
+
+def gen_deep(rng, depth):
+    lines = ["function r = deep(n)", "  r = 0;"]
+    for i in range(depth):
+        lines.append("  " * (i + 1) + (i % 2 and "if r < %d" % i or
+                                       "for k%d=1:2" % i))
+    lines.append("  " * (depth + 1) + "r = r + 1;")
+    lines.extend("  " * (i + 1) + "end" for i in reversed(range(depth)))
+    return lines
+
+def gen_matrix(rng, rows, cols):
+    lines = ["function a = matrix()", "  a = ["]
+    lines.extend("    " + " ".join("%.4f" % rng.random() for j in range(cols))
+                 + ";" for i in range(rows))
+    lines.append("  ];")
+    return lines
+
+def generate(dirname, scale=1, seed=0):
+    """Writes the corpus to dirname, the same for the same scale and
+    seed, and returns {kind: [FILE.m ...]}.  The kinds are
+
+        small     many files of a small function each
+        huge      one file of many functions
+        deep      deeply nested control flow
+        matrix    large matrix literals
+        comments  functions with a comment per statement
+    """
+    rng = random.Random(seed)
+    files = {}
+    def write(kind, name, lines):
+        filename = os.path.join(dirname, kind, name + ".m")
+        with open(filename, "w") as fp:
+            fp.write("\n".join(lines) + "\n")
+        files.setdefault(kind, []).append(filename)
+    for kind in KINDS:
+        os.makedirs(os.path.join(dirname, kind))
+    for i in range(50 * scale):
+        write("small", "small%d" % i, gen_function(rng, "small%d" % i, 10))
+    write("huge", "huge", [line for i in range(100 * scale)
+                           for line in gen_function(rng, "f%d" % i, 40)])
+    for i in range(5 * scale):
+        write("deep", "deep%d" % i, gen_deep(rng, 40))
+    for i in range(5 * scale):
+        write("matrix", "matrix%d" % i, gen_matrix(rng, 200, 20))
+    for i in range(10 * scale):
+        write("comments", "comments%d" % i,
+              gen_function(rng, "comments%d" % i, 40, comments=True))
+    return files
+
+def translate_corpus(files, trace):
+    """Translates files, and returns {phase: {field: value}} summed
+    over them, see timing.totals()"""
+    from . import main, options, timing
+    options.no_cache = True
+    timing.start(trace)
+    try:
+        for f in files:
+            main.translate(f)
+        return timing.totals()
+    finally:
+        timing.stop()
+
+def corpus(args):
+    """Lines per second and peak allocated memory of each phase of the
+    driver, over a generated corpus of .m files"""
+    from .timing import PHASES
+    dirname = args.dir or tempfile.mkdtemp(prefix="smop-corpus-")
+    for kind in KINDS:
+        # written by an earlier run -- the rest of dirname is not ours
+        if os.path.isdir(os.path.join(dirname, kind)):
+            shutil.rmtree(os.path.join(dirname, kind))
+    try:
+        files = generate(dirname, args.scale)
+        results = {}
+        print("%-9s %7s" % ("", "lines") +
+              "".join("%9s" % p for p in PHASES[1:-1]) +
+              "%9s" % "total" + "  lines/s, peak KB")
+        for kind in KINDS:
+            nlines = 0
+            for f in files[kind]:
+                with open(f) as fp:
+                    nlines += sum(1 for line in fp)
+            # Best of args.repeat for the time, tracemalloc aside
+            times = [translate_corpus(files[kind], False)
+                     for i in range(args.repeat)]
+            mem = translate_corpus(files[kind], True)
+            row = {}
+            for p in PHASES[1:-1]:
+                t = min(r[p]["wall"] for r in times)
+                row[p] = nlines / t if t else 0.0
+                results["%s_%s_lines_per_s" % (kind, p)] = row[p]
+                results["%s_%s_peak_kb" % (kind, p)] = mem[p]["peak_kb"]
+            t = min(sum(r[p]["wall"] for p in r) for r in times)
+            results[kind + "_lines_per_s"] = nlines / t
+            print("%-9s %7d" % (kind, nlines) +
+                  "".join("%9.0f" % row[p] for p in PHASES[1:-1]) +
+                  "%9.0f" % results[kind + "_lines_per_s"])
+            print("%-9s %7s" % ("", "") +
+                  "".join("%9.0f" % mem[p]["peak_kb"] for p in PHASES[1:-1]))
+    finally:
+        if not args.dir:
+            shutil.rmtree(dirname)
+    if args.baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fp:
+                base = json.load(fp)
+            if not compare(base, results, args.tolerance):
+                args.failed = True
+        else:
+            with open(args.baseline, "w") as fp:
+                json.dump(results, fp, indent=1, sort_keys=True)
+            print("baseline written to", args.baseline)
+    return results
+
+def compare(base, results, tolerance):
+    """Prints the change of the throughput of each kind from base.
+    Returns False if any is slower by more than tolerance percent."""
+    ok = True
+    for kind in KINDS:
+        name = kind + "_lines_per_s"
+        if name not in base:
+            continue
+        change = (results[name] / base[name] - 1) * 100
+        slower = change < -tolerance
+        ok = ok and not slower
+        print("%-9s %9.0f -> %9.0f lines/s %+6.1f%%%s" %
+              (kind, base[name], results[name], change,
+               "  SLOWER" if slower else ""))
+    return ok
+
+def smop_command(*args):
+    return [sys.executable, "-c", "from smop.main import main; main()"] + \
+        list(args)
+
+def serve(args):
+    """Round trip time of a request to smop --serve, compared to the
+    time to run smop on the file"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(dirname), env.get("PYTHONPATH", "")])
+    files = args.files or sample_files()
+    tmp = tempfile.mkdtemp(prefix="smop-serve-")
+    cold = []
+    try:
+        for f in files:
+            for i in range(args.repeat):
+                t0 = time.time()
+                subprocess.check_call(smop_command("--no-cache", "-o",
+                                                   os.path.join(tmp, "a.py"),
+                                                   f),
+                                      env=env, stderr=subprocess.DEVNULL)
+                cold.append(time.time() - t0)
+    finally:
+        shutil.rmtree(tmp)
+    server = subprocess.Popen(smop_command("--serve", "--no-cache"), env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL,
+                              universal_newlines=True)
+    warm = []
+    try:
+        for f in files:
+            with open(f) as fp:
+                request = json.dumps({"filename": f, "source": fp.read()})
+            for i in range(args.repeat + 1):
+                t0 = time.time()
+                server.stdin.write(request + "\n")
+                server.stdin.flush()
+                response = json.loads(server.stdout.readline())
+                if i:  # the first one warms up the worker
+                    warm.append(time.time() - t0)
+                if response["error"]:
+                    raise RuntimeError(response["error"])
+    finally:
+        server.stdin.close()
+        server.wait()
+    results = {"cold_ms": median(cold) * 1000,
+               "warm_ms": median(warm) * 1000}
+    print("smop FILE.m   %8.1f ms" % results["cold_ms"])
+    print("smop --serve  %8.1f ms" % results["warm_ms"])
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m smop.benchmark")
+    parser.add_argument("--record", metavar="FILE.json",
+                        help="""store the results in FILE.json, keyed
+                        by the smop version, and show the history""")
+    subparsers = parser.add_subparsers(dest="command")
+    p = subparsers.add_parser("startup", help=startup.__doc__)
+    p.add_argument("-n", "--repeat", type=int, default=10)
+    p.set_defaults(func=startup)
+    p = subparsers.add_parser("memory", help=memory.__doc__)
+    p.add_argument("files", nargs="*", metavar="FILE.m")
+    p.set_defaults(func=memory)
+    p = subparsers.add_parser("emit", help=emit.__doc__)
+    p.add_argument("files", nargs="*", metavar="FILE.m")
+    p.set_defaults(func=emit)
+    p = subparsers.add_parser("index", help=index.__doc__)
+    p.add_argument("-N", "--size", type=int, default=100)
+    p.add_argument("-n", "--number", type=int, default=10000)
+    p.add_argument("-r", "--repeat", type=int, default=5)
+    p.set_defaults(func=index)
+    p = subparsers.add_parser("corpus", help=corpus.__doc__)
+    p.add_argument("--dir", help="""generate the corpus in DIR, and
+                   keep it, instead of a temporary directory""")
+    p.add_argument("-s", "--scale", type=int, default=1,
+                   help="multiply the number of files and functions")
+    p.add_argument("-r", "--repeat", type=int, default=3)
+    p.add_argument("--baseline", metavar="FILE.json",
+                   help="""compare to the results in FILE.json, or
+                   store them there if it does not exist""")
+    p.add_argument("--tolerance", metavar="PCT", type=float, default=20,
+                   help="allowed slowdown from the baseline (default 20)")
+    p.set_defaults(func=corpus)
+    p = subparsers.add_parser("serve", help=serve.__doc__)
+    p.add_argument("files", nargs="*", metavar="FILE.m")
+    p.add_argument("-n", "--repeat", type=int, default=5)
+    p.set_defaults(func=serve)
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return
+    sys.argv = sys.argv[:1]  # see the module docstring
+    args.failed = False
+    results = args.func(args)
+    if args.record:
+        show_history(record(args.record, args.command, results),
+                     args.command)
+    if args.failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
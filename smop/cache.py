@@ -0,0 +1,120 @@
+# SMOP compiler -- Simple Matlab/Octave to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Persistent cache of translated files.
+
+An entry is the generated python text of one .m file, keyed by
+the hash of the source text, of the compiler itself (the version
+string and the sources of the smop package), and of the options
+which change the generated code.  Entries live in files named
+after their keys, two levels deep to keep directories small.
+Each hit refreshes the mtime of the entry, so that evict() can
+drop the least recently used entries first.
+
+evict() walks the whole cache, so it is run only by the processes
+which store entries, each time they have stored a sixteenth of the
+size of the cache since the last time, and at the end of a run.
+Thus the cache stays bounded under --serve and --watch, too, whose
+processes never end, and reading the cache costs no walk.
+"""
+
+import hashlib
+import os
+
+from . import options
+from . import version
+
+# options which change the generated code
+flags = ("no_analysis", "no_comments", "no_numbers", "no_resolve",
+         "testing_mode", "vectorize")
+
+_compiler = None
+
+EVICT_EVERY = 16  # fractions of the size of the cache, see above
+
+written = 0  # bytes stored by this process since the last evict()
+
+def compiler_digest():
+    """Hash of the version and of the sources of the smop package"""
+    global _compiler
+    if _compiler is None:
+        h = hashlib.sha1(version.__version__.encode())
+        dirname = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(dirname)):
+            if name.endswith(".py"):
+                with open(os.path.join(dirname, name), "rb") as fp:
+                    h.update(name.encode())
+                    h.update(fp.read())
+        _compiler = h.hexdigest()
+    return _compiler
+
+def key(buf):
+    h = hashlib.sha1(compiler_digest().encode())
+    for flag in flags:
+        h.update(("%s=%s;" % (flag, getattr(options, flag))).encode())
+    if not options.no_numbers:
+        # line-number comments contain the file name
+        h.update(options.filename.encode())
+    h.update(b"\0")
+    h.update(buf.encode("utf-8"))
+    return h.hexdigest()
+
+def path(key):
+    return os.path.join(options.cache_dir, key[:2], key + ".py")
+
+def get(key):
+    """Returns the cached text, or None on a miss"""
+    try:
+        with open(path(key)) as fp:
+            s = fp.read()
+        os.utime(path(key), None)
+        return s
+    except (IOError, OSError):
+        return None
+
+def put(key, s):
+    """Stores s under key.  Failures are ignored -- the cache is
+    an optimization, so a read-only cache must not break smop"""
+    global written
+    dirname = os.path.dirname(path(key))
+    try:
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmpname = "%s.%d.tmp" % (path(key), os.getpid())
+        with open(tmpname, "w") as fp:
+            fp.write(s)
+        os.rename(tmpname, path(key))  # atomic, workers may race
+    except (IOError, OSError):
+        return
+    written += len(s)
+    if written * EVICT_EVERY > options.cache_size * 1024 * 1024:
+        evict()
+
+def evict(max_size=None):
+    """Removes the least recently used entries until the total
+    size of the cache is at most max_size bytes"""
+    global written
+    written = 0
+    if max_size is None:
+        max_size = options.cache_size * 1024 * 1024
+    entries = []
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(options.cache_dir):
+        for name in filenames:
+            fullname = os.path.join(dirpath, name)
+            try:
+                st = os.stat(fullname)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fullname))
+            total += st.st_size
+    entries.sort()
+    for mtime, size, fullname in entries:
+        if total <= max_size:
+            break
+        try:
+            os.remove(fullname)
+            total -= size
+        except OSError:
+            pass
@@ -18,7 +18,7 @@ def callgraph(G, stmt_list):
         assert isinstance(func,node.function)
         func_name = func.head.ident.name
         #resolve.resolve(func)
-        for s in node.postorder(func):
+        for s in node.postorder(func, node.funcall):
             if (s.__class__ is node.funcall and
                 s.func_expr.__class__ is  node.ident):
                 #if s.func_expr.name in G.nodes():
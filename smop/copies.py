@@ -0,0 +1,238 @@
+# smop -- Matlab to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Elision of the copies made by assignment.
+
+Matlab assignment x=y copies the value of y, and so does the
+generated x=copy(y), lest a store into x(i) change y, or the other
+way round.  Same for x=y(...), which may be a view of y, and for
+field stores s.f=y.  But if nothing stores into either the value
+of x or that of y, the two may well share it, and x=y will do.
+
+A store into x(i), x{i}, or x.f is found by resolve to be reached
+by some definitions of x -- these values are mutated.  The copy in
+x=y is elided if neither the definition of x, nor those of y which
+reach it, is mutated.  A value is also mutated if it is passed to
+a function of the same file which stores into its parameter, or
+returns it and the result is stored into, or if x=s.f is stored
+into, since that does not copy s.f.  Since generated functions do
+not copy their parameters either, a value passed to a function of
+another file is mutated too, unless the function is one of the
+library functions listed in pure.  This holds for the arguments
+x(...), x{...} and x.f, as well as x, since they may share the
+value of x.
+A subscripted read x(...) may be a view of x, so it is copied, too,
+when it is passed to a function which may store into it, or return
+it.
+Globals and persistents are always copied, since they may be
+changed anywhere, and so are return values, which the caller may
+change.  When a function is translated apart from the rest of its
+file, as by --watch, a call to another function of the file is
+assumed to store into its arguments.
+"""
+
+from . import node
+
+# Functions of libsmop and numpy, and matlab builtins, which do not
+# store into their arguments
+pure = frozenset("""abs all any arange ceil cell concat copy cumprod
+    cumsum disp dot eig exp false find fix floor fprintf inv isa
+    iscellstr ischar isempty isequal isfield isinf ismatrix isnan
+    isnumeric isreal isscalar isvector length log logical_and
+    logical_not logical_or max mean min mod multiply ndims norm numel
+    ones prod qr rand randn ravel roots round rows size size_equal sort
+    sqrt strcmp strrep sum tic toc toupper true zeros""".split())
+
+def elide_copies(t, opaque=()):
+    """Sets copy=False on the assignments of the resolved tree t
+    which need not copy, and copies the views passed to functions,
+    see copy_views.  Returns the number of assignments which need
+    not copy.  opaque names the functions of the same file which
+    are not in t."""
+    mutated = mutated_defs(t, opaque)
+    copy_views(t, mutated, opaque)
+    shared = set(v.name for u in node.preorder(t, (node.global_stmt,
+                                                   node.persistent_stmt))
+                 for v in u.global_list)
+    n = 0
+    for u, returned in lets(t):
+        x = u.ret if u.ret.__class__ is node.ident else field_root(u.ret)
+        if x is None:
+            continue
+        y = source(u.args)
+        if y is None:
+            # a new value, copied only into fields
+            if x is not u.ret:
+                u.copy = False
+                n += 1
+        elif not (x.name in returned or x.name in shared or
+                  y.name in shared or id(x) in mutated or
+                  any(id(d) in mutated for d in y.defs or ())):
+            u.copy = False
+            n += 1
+    return n
+
+def lets(t):
+    """Yields the assignments of t, with the names returned by the
+    function of each.  Function bodies are the statements which
+    follow func_stmt in the top level list."""
+    returned = ()
+    for u in t:
+        if u.__class__ is node.func_stmt:
+            returned = set(v.name for v in node.preorder(u.ret, node.ident))
+        else:
+            for v in node.preorder(u, node.let):
+                yield v, returned
+
+def source(t):
+    """The variable whose value t may share, or None if t is a new
+    value"""
+    if t.__class__ in (node.funcall, node.arrayref):
+        t = t.func_expr
+    elif t.__class__ is node.expr and t.op == ".":
+        return field_root(t)
+    if t.__class__ is node.ident and t.defs:
+        return t
+    return None
+
+def field_root(t):
+    """x for the field store x.f1.f2..., otherwise None"""
+    if not (t.__class__ is node.expr and t.op == "."):
+        return None
+    while t.__class__ is node.expr and t.op == ".":
+        t = t.args[0]
+    return t if t.__class__ is node.ident else None
+
+def root(t):
+    """x for the stores x(i), x{i}, x.f, x.f(i) ..., otherwise None"""
+    while True:
+        if isinstance(t, node.funcall):
+            t = t.func_expr
+        elif t.__class__ is node.expr and t.op == ".":
+            t = t.args[0]
+        else:
+            return t if t.__class__ is node.ident else None
+
+def targets(ret):
+    """The items of [x(i),y]=..., whose rows are nested lists"""
+    a = []
+    for r in ret:
+        if r.__class__ is node.expr_list:
+            a.extend(targets(r))
+        else:
+            a.append(r)
+    return a
+
+def functions(t):
+    """The func_stmts of t, by name"""
+    return dict((u.ident.name, u)
+                for u in node.preorder(t, node.func_stmt) if u.ident)
+
+def copy_views(t, mutated, opaque=()):
+    """Wraps in copy() the subscripted arguments x(...) of the calls
+    to functions which may store into them, or return them.  x(...)
+    may be a view of x, which the function would then change, or
+    fail to grow.  Returns the number of arguments copied."""
+    funcs = functions(t)
+    n = 0
+    for u in node.preorder(t, node.funcall):
+        if not (u.__class__ is node.funcall and
+                u.func_expr.__class__ is node.ident and
+                not u.func_expr.defs):
+            continue
+        name = u.func_expr.name
+        if name in funcs:
+            g = funcs[name]
+            returned = set(v.name for v in node.preorder(g.ret, node.ident))
+        elif name in pure and name not in opaque:
+            continue
+        else:
+            g = None
+        for i, a in enumerate(u.args):
+            if not (a.__class__ in (node.funcall, node.arrayref) and
+                    a.func_expr.__class__ is node.ident and
+                    a.func_expr.defs):
+                continue
+            if g is not None and i < len(g.args):
+                p = g.args[i]
+                if (p.name != "varargin" and id(p) not in mutated and
+                        p.name not in returned):
+                    continue
+            u.args[i] = node.funcall(func_expr=node.ident("copy"),
+                                     args=node.expr_list([a]))
+            n += 1
+    return n
+
+def aliased(a):
+    """Ids of the definitions whose value the argument a may share:
+    those of x for x, x(...), x{...} or x.f"""
+    v = root(a)
+    if v is None:
+        return ()
+    return [id(d) for d in v.defs or ()]
+
+def callee(u, funcs):
+    """The func_stmt called by u, if it is in funcs"""
+    if u.__class__ is node.funcall and u.func_expr.__class__ is node.ident:
+        if not u.func_expr.defs:
+            return funcs.get(u.func_expr.name)
+    return None
+
+def mutated_defs(t, opaque=()):
+    """Ids of the definitions whose values are stored into"""
+    mutated = set()
+    for u in node.preorder(t, (node.let, node.setfield)):
+        if u.__class__ is node.setfield:
+            rets = [u.args[0]]
+        elif u.ret.__class__ is node.ident:
+            continue
+        elif u.ret.__class__ is node.expr_list:  # [x(i),y]=f()
+            rets = [r for r in targets(u.ret) if r.__class__ is not node.ident]
+        else:
+            rets = [u.ret]
+        for r in rets:
+            v = root(r)
+            if v is not None:
+                mutated.update(id(d) for d in v.defs or ())
+    # The backend does not copy x=s.f, so a store into x is a store
+    # into s.  Neither is an argument copied, so a function of this
+    # file which stores into its parameter stores into the argument,
+    # and one which returns its parameter returns the argument.  So
+    # does x(...), which may be a view of x, or x{...}, which is the
+    # element itself.
+    funcs = functions(t)
+    for u in node.preorder(t, node.funcall):
+        if (u.__class__ is node.funcall and
+                u.func_expr.__class__ is node.ident and
+                not u.func_expr.defs and
+                u.func_expr.name not in funcs and
+                (u.func_expr.name in opaque or
+                 u.func_expr.name not in pure)):
+            for a in u.args:
+                mutated.update(aliased(a))
+    while True:
+        n = len(mutated)
+        for u in node.preorder(t, (node.let, node.funcall)):
+            if u.__class__ is node.let:
+                v = field_root(u.args)
+                if (v is not None and u.ret.__class__ is node.ident and
+                        id(u.ret) in mutated):
+                    mutated.update(id(d) for d in v.defs or ())
+                g = callee(u.args, funcs)
+                if g is not None:
+                    outs = (targets(u.ret) if u.ret.__class__ is
+                            node.expr_list else [u.ret])
+                    for x, r in zip(outs, g.ret):
+                        if x.__class__ is node.ident and id(x) in mutated:
+                            for p, a in zip(g.args, u.args.args):
+                                if p.name == r.name:
+                                    mutated.update(aliased(a))
+                continue
+            g = callee(u, funcs)
+            if g is not None:
+                for p, a in zip(g.args, u.args):
+                    if id(p) in mutated:
+                        mutated.update(aliased(a))
+        if len(mutated) == n:
+            return mutated
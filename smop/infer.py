@@ -0,0 +1,290 @@
+# smop -- Matlab to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Type and shape inference, skipped with -A.
+
+Each variable is classified by the values it may hold:
+
+    index   positive integer, such as a counted loop variable
+    int     integer
+    scalar  real number, a python or numpy scalar
+    vector  numeric matlabarray, 1 by n or n by 1
+    matrix  numeric matlabarray of any shape
+    char    string
+    cell    cell array
+
+or None, if it is unknown or mixed, as it is for globals and
+persistents which are not arrays.  The kinds of the definitions are found by iterating
+to a fixed point over the def-use chains built by resolve, starting
+from literals, the loop ranges, and the results of a few functions
+of libsmop such as zeros and numel.
+
+The kind is stored in the idents, and used to generate plain
+python where it is safe:
+
+- a counted loop, for k=1:n, iterates over range(1,int(n) + 1),
+  instead of an array, still as numpy ints (see backend);
+- a product of scalars a*b or a.*b is a python product instead of
+  a call to dot or multiply;
+- an element of a vector or of a matrix, x(i) or x(i,j), where the
+  subscripts are of kind index, is read with x.item(i - 1,j - 1),
+  which returns a python float;
+- other subscripted reads of matlabarrays, x(...), are emitted as
+  indexing x[...] instead of calls.
+
+Everything else is left to matlabarray.
+"""
+
+from . import node
+
+INDEX = "index"
+INT = "int"
+SCALAR = "scalar"
+VECTOR = "vector"
+MATRIX = "matrix"
+CHAR = "char"
+CELL = "cell"
+
+NUMBERS = (INDEX, INT, SCALAR)  # in order
+ARRAYS = (VECTOR, MATRIX)
+
+UNDEF = ""  # the kind of definitions not yet reached
+
+def join(a, b):
+    """The least kind which includes both a and b"""
+    if a == UNDEF or a == b:
+        return b
+    if b == UNDEF:
+        return a
+    if a in NUMBERS and b in NUMBERS:
+        return NUMBERS[max(NUMBERS.index(a), NUMBERS.index(b))]
+    if a in ARRAYS and b in ARRAYS:
+        return MATRIX
+    return None
+
+def infer(t):
+    """Sets the kind of each ident of the resolved tree t, and
+    rewrites the expressions which may use plain python"""
+    kinds = solve(t)
+    for u in node.preorder(t, node.ident):
+        # x in x(i)=... is both a use and a definition, of the value
+        # after the store
+        if id(u) in kinds or u.defs is None:
+            u.kind = kinds.get(id(u)) or None
+        elif u.defs:
+            u.kind = use_kind(u, kinds) or None
+    rewrite(t, kinds)
+
+def solve(t):
+    """Returns a dict id(def) -> kind.  Any call may assign a matrix
+    to a global or a persistent, so their kinds are joined with
+    MATRIX: they are of unknown kind, unless they are arrays."""
+    shared = set(v.name for u in node.preorder(t, (node.global_stmt,
+                                                   node.persistent_stmt))
+                 for v in u.global_list)
+    sites = []
+    for u in node.preorder(t, (node.let, node.for_stmt)):
+        if u.__class__ is node.for_stmt:
+            sites.append((u.ident, u))
+        elif u.ret.__class__ is node.ident:
+            sites.append((u.ret, u))
+        elif (u.ret.__class__ in (node.arrayref, node.cellarrayref) and
+              u.ret.func_expr.__class__ is node.ident):
+            sites.append((u.ret.func_expr, u))
+    kinds = dict((id(d), MATRIX if d.name in shared else UNDEF)
+                 for d, u in sites)
+    changed = True
+    while changed:
+        changed = False
+        for d, u in sites:
+            k = join(kinds[id(d)], define(u, kinds))
+            if k != kinds[id(d)]:
+                kinds[id(d)] = k
+                changed = True
+    return kinds
+
+def define(u, kinds):
+    """Kind of the value defined by u, a let or a for_stmt"""
+    if u.__class__ is node.for_stmt:
+        if not (u.expr.__class__ is node.expr and u.expr.op == ":"):
+            return None
+        if any(kind(a, kinds) == UNDEF for a in u.expr.args):
+            return UNDEF
+        if is_counted(u, kinds):
+            return INDEX
+        return SCALAR  # iterates over a numpy array
+    k = kind(u.args, kinds)
+    if u.ret.__class__ is node.ident or k == UNDEF:
+        return k
+    # x(i)=... or x{i}=... does not change the kind of x, except
+    # that a vector may become a matrix
+    x = use_kind(u.ret.func_expr, kinds)
+    if u.ret.__class__ is node.cellarrayref:
+        return CELL if x == CELL else None
+    if x == UNDEF or k not in NUMBERS + ARRAYS:
+        return x and None
+    if x == VECTOR and len(u.ret.args) == 1:
+        return VECTOR
+    return MATRIX if x in ARRAYS else None
+
+def is_counted(u, kinds):
+    """True if the for loop u is over lo:hi or lo:step:hi, where lo
+    and step are positive integer literals, and hi a number"""
+    e = u.expr
+    return (e.__class__ is node.expr and e.op == ":" and
+            len(e.args) in (2, 3) and
+            all(kind(a, kinds) == INDEX and a.__class__ is node.number
+                for a in e.args[:1] + e.args[2:]) and
+            kind(e.args[1], kinds) in NUMBERS)
+
+def use_kind(u, kinds):
+    k = UNDEF
+    for d in u.defs or ():
+        k = join(k, kinds.get(id(d)))
+    return k
+
+def kind(t, kinds):
+    """Kind of the value of the expression t"""
+    cls = t.__class__
+    if cls is node.number:
+        if type(t.value) is int:
+            return INDEX if t.value >= 1 else INT
+        return SCALAR if type(t.value) is float else None
+    if cls is node.string:
+        return CHAR
+    if cls is node.ident:
+        return use_kind(t, kinds) if t.defs else None
+    if cls is node.cellarray:
+        return CELL
+    if cls is node.expr:
+        a = [kind(v, kinds) for v in t.args]
+        if UNDEF in a:
+            return UNDEF
+        if t.op == "parens":
+            return a[0]
+        if t.op == ":" and t.args:
+            return VECTOR
+        if len(a) == 1 and t.op in ("-", "+"):
+            if a[0] == INDEX and t.op == "-":
+                return INT
+            return a[0] if a[0] in NUMBERS + ARRAYS else None
+        if len(a) == 2 and t.op in ("+", "-", "/", "./", "^", ".^"):
+            return arith(t.op, a[0], a[1])
+        return None
+    if cls is node.funcall:
+        f = t.func_expr
+        if f.__class__ is not node.ident:
+            return None
+        if f.defs:
+            x = use_kind(f, kinds)
+            if x == UNDEF or any(kind(v, kinds) == UNDEF for v in t.args):
+                return UNDEF
+            if x in ARRAYS:
+                return SCALAR if is_element(t, x, kinds) else MATRIX
+            return None
+        return call_kind(f.name, [kind(v, kinds) for v in t.args], t.args)
+    return None
+
+def arith(op, a, b):
+    if UNDEF in (a, b):
+        return UNDEF
+    if a in NUMBERS and b in NUMBERS:
+        if op in ("+", "*", ".*") and a == b == INDEX:
+            return INDEX
+        if op in ("+", "-", "*", ".*") and SCALAR not in (a, b):
+            return INT
+        return SCALAR
+    if a in ARRAYS and b in NUMBERS:
+        return a
+    if b in ARRAYS and a in NUMBERS:
+        return b
+    if a in ARRAYS and b in ARRAYS:
+        return MATRIX
+    return None
+
+def call_kind(name, a, args):
+    """Kind of the result of the libsmop function name"""
+    if UNDEF in a:
+        return UNDEF
+    if name in ("numel", "length", "ndims") and len(a) == 1:
+        return INT
+    if name == "size" and len(a) == 2:
+        return INT
+    if name in ("zeros", "ones") and a:
+        if len(a) == 2 and any(v.__class__ is node.number and v.value == 1
+                               for v in args):
+            return VECTOR
+        return MATRIX
+    if name in ("abs", "sqrt", "exp", "log", "ceil", "round", "fix"):
+        if len(a) == 1 and a[0] in NUMBERS:
+            return SCALAR
+        if len(a) == 1 and a[0] in ARRAYS:
+            return a[0]
+    if name == "floor" and len(a) == 1 and a[0] in NUMBERS:
+        return INT
+    if name == "mod" and len(a) == 2 and a[0] in NUMBERS and a[1] in NUMBERS:
+        return INT if SCALAR not in a else SCALAR
+    if name in ("dot", "multiply") and len(a) == 2:
+        k = arith("*", a[0], a[1])
+        if name == "dot" and a[0] in ARRAYS and a[1] in ARRAYS:
+            return MATRIX
+        return k
+    if name == "cell":
+        return CELL
+    return None
+
+def is_element(t, x, kinds):
+    """True if t, a subscripted read of an array of kind x, is of
+    one element, which item() can read"""
+    return (len(t.args) == 2 or len(t.args) == 1 and x == VECTOR) and \
+        all(kind(v, kinds) == INDEX for v in t.args)
+
+def rewrite(t, kinds):
+    """Rewrites the reads of arrays, and the products of scalars.
+    What to do is decided on the original tree, which is then
+    rewritten bottom up."""
+    todo = {}
+    for u in node.preorder(t, node.funcall):
+        if u.__class__ is not node.funcall:
+            continue
+        f = u.func_expr
+        if f.__class__ is not node.ident:
+            continue
+        if f.defs:
+            x = use_kind(f, kinds)
+            if x in ARRAYS and is_element(u, x, kinds):
+                todo[id(u)] = "item"
+            elif x in ARRAYS + (CELL,):
+                todo[id(u)] = "index"
+        elif f.name in ("dot", "multiply") and len(u.args) == 2:
+            if all(kind(v, kinds) in NUMBERS for v in u.args):
+                todo[id(u)] = "mul"
+    if not todo:
+        return
+    new = {}
+    for u in node.postorder(t):
+        fields = node.children(u.__class__)
+        if fields is None:
+            for i, v in enumerate(u):
+                if id(v) in new:
+                    u[i] = new[id(v)]
+        else:
+            for name in fields:
+                v = getattr(u, name)
+                if id(v) in new:
+                    setattr(u, name, new[id(v)])
+        what = todo.get(id(u))
+        if what == "index":
+            u.__class__ = node.arrayref
+        elif what == "item":
+            u.args = node.expr_list(
+                node.number(v.value - 1) if v.__class__ is node.number
+                else node.expr(op="-", args=node.expr_list([v,
+                                                            node.number(1)]))
+                for v in u.args)
+            u.func_expr = node.expr(op=".",
+                                    args=node.expr_list([u.func_expr,
+                                                         node.ident(".item")]))
+        elif what == "mul":
+            new[id(u)] = node.expr(op="*", args=u.args)
@@ -2,7 +2,9 @@
 # Copyright 2011-2016 Victor Leikehman
 
 import sys
+import os
 import re
+import hashlib
 import ply.lex as lex
 from ply.lex import TOKEN
 from . import options
@@ -42,7 +44,53 @@ reserved = {
     }
 tokens += list(reserved.values())
 
+_lexer = None  # built once per process, see new()
+
 def new():
+    """
+    Returns a lexer ready to be fed a new buffer.  Building a
+    lexer compiles the master regex from all the t_* rules, so
+    it is done only once per process, and the rest of the lexers
+    are clones of the first one with their state reset.
+    """
+    global _lexer
+    if _lexer is None:
+        _lexer = build()
+    lexer = _lexer.clone()
+    lexer.brackets = 0  # count open square brackets
+    lexer.parens = 0  # count open parentheses
+    lexer.braces = 0  # count open curly braces
+    lexer.stack = []
+    lexer.lexstatestack = []
+    lexer.lineno = 1
+    lexer.begin("INITIAL")
+    return lexer
+
+def digest():
+    """Hash of this file, recorded in lextab.py to detect stale tables"""
+    with open(os.path.splitext(__file__)[0] + ".py", "rb") as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
+def has_lextab():
+    try:
+        from . import lextab
+    except ImportError:
+        return False
+    if getattr(lextab, "_digest", None) == digest():
+        return True
+    sys.stderr.write("smop: lextab.py is out of date, "
+                     "run 'make lextab.py' in the smop directory\n")
+    return False
+
+def writetab(outputdir):
+    """Writes lextab.py, which lets build() skip the validation
+    of the rules and the construction of the master regex"""
+    lexer = build(optimize=0)
+    lexer.writetab("lextab", outputdir)
+    with open(os.path.join(outputdir, "lextab.py"), "a") as fp:
+        fp.write("_digest = %r\n" % digest())
+
+def build(optimize=None):
     t_AND         = r"\&"
     t_ANDAND      = r"\&\&"
     t_ANDEQ       = r"\&="
@@ -322,12 +370,10 @@ def new():
     def t_error(t):
         raise_exception(SyntaxError, ('Unexpected "%s" (lexer)' % t.value), t.lexer)
 
-    lexer = lex.lex(reflags=re.MULTILINE)
-    lexer.brackets = 0  # count open square brackets
-    lexer.parens = 0  # count open parentheses
-    lexer.braces = 0  # count open curly braces
-    lexer.stack = []
-    return lexer
+    if optimize is None:
+        optimize = has_lextab()
+    # In optimized mode, ply reads the rules from smop/lextab.py
+    return lex.lex(reflags=re.MULTILINE, optimize=optimize, lextab="lextab")
 
 def raise_exception(error_type, message, my_lexer):
     startpos = 1 + my_lexer.lexdata.rfind("\n", 0, my_lexer.lexpos)
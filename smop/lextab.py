@@ -0,0 +1,11 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'ANDAND', 'ANDEQ', 'BACKSLASH', 'BREAK', 'CASE', 'CATCH', 'CLASSDEF', 'COLON', 'COMMA', 'COMMENT', 'CONTINUE', 'DIV', 'DIVEQ', 'DOT', 'DOTDIV', 'DOTDIVEQ', 'DOTEXP', 'DOTMUL', 'DOTMULEQ', 'ELSE', 'ELSEIF', 'END_EXPR', 'END_FUNCTION', 'END_STMT', 'END_UNEXPECTED', 'END_UNWIND_PROTECT', 'EQ', 'EQEQ', 'ERROR_STMT', 'EXP', 'EXPEQ', 'FIELD', 'FOR', 'FUNCTION', 'GE', 'GLOBAL', 'GT', 'HANDLE', 'IDENT', 'IF', 'LBRACE', 'LBRACKET', 'LE', 'LPAREN', 'LT', 'MINUS', 'MINUSEQ', 'MINUSMINUS', 'MUL', 'MULEQ', 'NE', 'NEG', 'NUMBER', 'OR', 'OREQ', 'OROR', 'OTHERWISE', 'PERSISTENT', 'PLUS', 'PLUSEQ', 'PLUSPLUS', 'POW', 'RBRACE', 'RBRACKET', 'RETURN', 'RPAREN', 'SEMI', 'STRING', 'SWITCH', 'TRANSPOSE', 'TRY', 'UNWIND_PROTECT', 'UNWIND_PROTECT_CLEANUP', 'WHILE'))
+_lexreflags   = 8
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive', 'matrix': 'inclusive', 'afterkeyword': 'exclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_TRANSPOSE>(?<=\\w|\\]|\\)|\\})((\\.\')|\')+)|(?P<t_STRING>("([^"\\a\\b\\f\\r\\t\\0\\v\\n\\\\]|(\\\\[abfn0vtr\\"\\n\\\\])|(""))*")|(\'([^\']|(\'\'))*\'))|(?P<t_IDENT>(\\.(\\s|\\.\\.\\..*\\n|\\\\\\n)*)?[a-zA-Z_][a-zA-Z_0-9]*)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_RBRACKET>(\\s|\\.\\.\\..*\\n|\\\\\\n)*\\])|(?P<t_LBRACKET>\\[(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_RBRACE>(\\s|\\.\\.\\..*\\n|\\\\\\n)*\\})|(?P<t_LBRACE>\\{(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_COMMA>,(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_SEMI>\\;(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_NUMBER>(0x[0-9A-Fa-f]+)|((\\d+(\\.\\d*)?|\\.\\d+)([eE][-+]?\\d+)?[ij]?))|(?P<t_NEWLINE>\\n+)|(?P<t_ERROR_STMT>%!(error|warning|test).*\\n)|(?P<t_COMMENT>(^[ \\t]*[%#][^!\\n].*\\n)+)|(?P<t_comment>(%|\\#)!?)|(?P<t_ELLIPSIS>\\.\\.\\..*\\n)|(?P<t_SPACES>(\\\\\\n|[ \\t\\r])+)|(?P<t_NE>(~=)|(!=))|(?P<t_DOTMULEQ>\\.\\*=)|(?P<t_NEG>\\~|\\!)|(?P<t_ANDAND>\\&\\&)|(?P<t_DOTDIVEQ>\\./=)|(?P<t_DOTEXP>\\.\\^)|(?P<t_DOTMUL>\\.\\*)|(?P<t_POW>\\*\\*)|(?P<t_OROR>\\|\\|)|(?P<t_PLUSPLUS>\\+\\+)|(?P<t_ANDEQ>\\&=)|(?P<t_DIVEQ>\\/=)|(?P<t_DOTDIV>\\./)|(?P<t_EXPEQ>\\^=)|(?P<t_MINUSEQ>\\-=)|(?P<t_MINUSMINUS>\\--)|(?P<t_MULEQ>\\*=)|(?P<t_OREQ>\\|=)|(?P<t_PLUSEQ>\\+=)|(?P<t_AND>\\&)|(?P<t_BACKSLASH>\\\\)|(?P<t_DIV>\\/)|(?P<t_DOT>\\.)|(?P<t_EQEQ>==)|(?P<t_EXP>\\^)|(?P<t_GE>>=)|(?P<t_GT>\\>)|(?P<t_HANDLE>\\@)|(?P<t_LE><=)|(?P<t_LT>\\<)|(?P<t_MINUS>\\-)|(?P<t_MUL>\\*)|(?P<t_OR>\\|)|(?P<t_PLUS>\\+)|(?P<t_COLON>:)|(?P<t_EQ>=)', [None, ('t_TRANSPOSE', 'TRANSPOSE'), None, None, ('t_STRING', 'STRING'), None, None, None, None, None, None, None, ('t_IDENT', 'IDENT'), None, None, ('t_LPAREN', 'LPAREN'), ('t_RPAREN', 'RPAREN'), ('t_RBRACKET', 'RBRACKET'), None, ('t_LBRACKET', 'LBRACKET'), None, ('t_RBRACE', 'RBRACE'), None, ('t_LBRACE', 'LBRACE'), None, ('t_COMMA', 'COMMA'), None, ('t_SEMI', 'SEMI'), None, ('t_NUMBER', 'NUMBER'), None, None, None, None, None, ('t_NEWLINE', 'NEWLINE'), ('t_ERROR_STMT', 'ERROR_STMT'), None, ('t_COMMENT', 'COMMENT'), None, ('t_comment', 'comment'), None, ('t_ELLIPSIS', 'ELLIPSIS'), ('t_SPACES', 'SPACES'), None, (None, 'NE'), None, None, (None, 'DOTMULEQ'), (None, 'NEG'), (None, 'ANDAND'), (None, 'DOTDIVEQ'), (None, 'DOTEXP'), (None, 'DOTMUL'), (None, 'POW'), (None, 'OROR'), (None, 'PLUSPLUS'), (None, 'ANDEQ'), (None, 'DIVEQ'), (None, 'DOTDIV'), (None, 'EXPEQ'), (None, 'MINUSEQ'), (None, 'MINUSMINUS'), (None, 'MULEQ'), (None, 'OREQ'), (None, 'PLUSEQ'), (None, 'AND'), (None, 'BACKSLASH'), (None, 'DIV'), (None, 'DOT'), (None, 'EQEQ'), (None, 'EXP'), (None, 'GE'), (None, 'GT'), (None, 'HANDLE'), (None, 'LE'), (None, 'LT'), (None, 'MINUS'), (None, 'MUL'), (None, 'OR'), (None, 'PLUS'), (None, 'COLON'), (None, 'EQ')])], 'matrix': [('(?P<t_matrix_BAR>(?<=\\w)(\\s|\\.\\.\\..*\\n|\\\\\\n)+(?=\\())|(?P<t_matrix_FOO>(?<=[])}\'\\".]|\\w)(\\s|\\.\\.\\..*\\n|\\\\\\n)+(?=[-+]?([[({\'\\"]|\\w|\\.\\d)))', [None, ('t_matrix_BAR', 'BAR'), None, ('t_matrix_FOO', 'FOO')]), ('(?P<t_TRANSPOSE>(?<=\\w|\\]|\\)|\\})((\\.\')|\')+)|(?P<t_STRING>("([^"\\a\\b\\f\\r\\t\\0\\v\\n\\\\]|(\\\\[abfn0vtr\\"\\n\\\\])|(""))*")|(\'([^\']|(\'\'))*\'))|(?P<t_IDENT>(\\.(\\s|\\.\\.\\..*\\n|\\\\\\n)*)?[a-zA-Z_][a-zA-Z_0-9]*)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_RBRACKET>(\\s|\\.\\.\\..*\\n|\\\\\\n)*\\])|(?P<t_LBRACKET>\\[(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_RBRACE>(\\s|\\.\\.\\..*\\n|\\\\\\n)*\\})|(?P<t_LBRACE>\\{(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_COMMA>,(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_SEMI>\\;(\\s|\\.\\.\\..*\\n|\\\\\\n)*)|(?P<t_NUMBER>(0x[0-9A-Fa-f]+)|((\\d+(\\.\\d*)?|\\.\\d+)([eE][-+]?\\d+)?[ij]?))|(?P<t_NEWLINE>\\n+)|(?P<t_ERROR_STMT>%!(error|warning|test).*\\n)|(?P<t_COMMENT>(^[ \\t]*[%#][^!\\n].*\\n)+)|(?P<t_comment>(%|\\#)!?)|(?P<t_ELLIPSIS>\\.\\.\\..*\\n)|(?P<t_SPACES>(\\\\\\n|[ \\t\\r])+)|(?P<t_NE>(~=)|(!=))|(?P<t_DOTMULEQ>\\.\\*=)|(?P<t_NEG>\\~|\\!)|(?P<t_ANDAND>\\&\\&)|(?P<t_DOTDIVEQ>\\./=)|(?P<t_DOTEXP>\\.\\^)|(?P<t_DOTMUL>\\.\\*)|(?P<t_POW>\\*\\*)|(?P<t_OROR>\\|\\|)|(?P<t_PLUSPLUS>\\+\\+)|(?P<t_ANDEQ>\\&=)|(?P<t_DIVEQ>\\/=)|(?P<t_DOTDIV>\\./)|(?P<t_EXPEQ>\\^=)|(?P<t_MINUSEQ>\\-=)|(?P<t_MINUSMINUS>\\--)|(?P<t_MULEQ>\\*=)|(?P<t_OREQ>\\|=)|(?P<t_PLUSEQ>\\+=)|(?P<t_AND>\\&)|(?P<t_BACKSLASH>\\\\)|(?P<t_DIV>\\/)|(?P<t_DOT>\\.)|(?P<t_EQEQ>==)|(?P<t_EXP>\\^)|(?P<t_GE>>=)|(?P<t_GT>\\>)|(?P<t_HANDLE>\\@)|(?P<t_LE><=)|(?P<t_LT>\\<)|(?P<t_MINUS>\\-)|(?P<t_MUL>\\*)|(?P<t_OR>\\|)|(?P<t_PLUS>\\+)|(?P<t_COLON>:)|(?P<t_EQ>=)', [None, ('t_TRANSPOSE', 'TRANSPOSE'), None, None, ('t_STRING', 'STRING'), None, None, None, None, None, None, None, ('t_IDENT', 'IDENT'), None, None, ('t_LPAREN', 'LPAREN'), ('t_RPAREN', 'RPAREN'), ('t_RBRACKET', 'RBRACKET'), None, ('t_LBRACKET', 'LBRACKET'), None, ('t_RBRACE', 'RBRACE'), None, ('t_LBRACE', 'LBRACE'), None, ('t_COMMA', 'COMMA'), None, ('t_SEMI', 'SEMI'), None, ('t_NUMBER', 'NUMBER'), None, None, None, None, None, ('t_NEWLINE', 'NEWLINE'), ('t_ERROR_STMT', 'ERROR_STMT'), None, ('t_COMMENT', 'COMMENT'), None, ('t_comment', 'comment'), None, ('t_ELLIPSIS', 'ELLIPSIS'), ('t_SPACES', 'SPACES'), None, (None, 'NE'), None, None, (None, 'DOTMULEQ'), (None, 'NEG'), (None, 'ANDAND'), (None, 'DOTDIVEQ'), (None, 'DOTEXP'), (None, 'DOTMUL'), (None, 'POW'), (None, 'OROR'), (None, 'PLUSPLUS'), (None, 'ANDEQ'), (None, 'DIVEQ'), (None, 'DOTDIV'), (None, 'EXPEQ'), (None, 'MINUSEQ'), (None, 'MINUSMINUS'), (None, 'MULEQ'), (None, 'OREQ'), (None, 'PLUSEQ'), (None, 'AND'), (None, 'BACKSLASH'), (None, 'DIV'), (None, 'DOT'), (None, 'EQEQ'), (None, 'EXP'), (None, 'GE'), (None, 'GT'), (None, 'HANDLE'), (None, 'LE'), (None, 'LT'), (None, 'MINUS'), (None, 'MUL'), (None, 'OR'), (None, 'PLUS'), (None, 'COLON'), (None, 'EQ')])], 'afterkeyword': [('(?P<t_afterkeyword_STRING>("([^"\\a\\b\\f\\r\\t\\0\\v\\n\\\\]|(\\\\[abfn0vtr\\"\\n\\\\])|(""))*")|(\'([^\']|(\'\'))*\'))', [None, ('t_afterkeyword_STRING', 'STRING')])]}
+_lexstateignore = {'INITIAL': '', 'matrix': ''}
+_lexstateerrorf = {'afterkeyword': 't_afterkeyword_error', 'INITIAL': 't_error', 'matrix': 't_error'}
+_lexstateeoff = {}
+_digest = '3e29b168dc1e233ffc0c2ce12a2c5952e0a556c0'
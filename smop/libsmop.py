@@ -3,29 +3,28 @@
 
 # MIT license
 
-import __builtin__
+try:
+    import __builtin__
+except ImportError:
+    import builtins as __builtin__
 
 import numpy
 from numpy import sqrt,prod,exp,log,dot,multiply,inf
 from numpy.fft import fft2
 from numpy.linalg import inv
 from numpy.linalg import qr  as _qr 
-try:
-    from scipy.linalg import schur as _schur
-except ImportError:
-    pass
 import numpy as np
 
 import os,sys,copy,time
 from sys import stdin,stdout,stderr
-try:
-    from scipy.io import loadmat
-except:
-    pass
-import unittest
-from scipy.special import gamma
 from numpy import rint as fix
 
+# scipy takes longer to import than the rest of the library, so
+# schur, loadmat and gamma import it on the first call.
+
+# np.array(copy=False) means "never copy" since numpy 2.0
+copy_if_needed = None if np.lib.NumpyVersion(np.__version__) >= "2.0.0" else False
+
 def isvector_or_scalar(a):
     """
     one-dimensional arrays having shape [N],
@@ -51,6 +50,12 @@ def isvector(a):
     except:
         return False
 
+def _integral(v):
+    """True if v is a python or numpy scalar of integer value"""
+    if isinstance(v,(int,np.integer)):
+        return True
+    return isinstance(v,(float,np.floating)) and float(v).is_integer()
+
 class matlabarray(np.ndarray):
     """
     >>> matlabarray()
@@ -59,14 +64,21 @@ class matlabarray(np.ndarray):
     matlabarray([1, 2, 3, 4, 5, 1, 2, 3, 4, 5])
     >>> matlabarray(["hello","world"])
     matlabarray("helloworld")
+
+    With copy=False, a fortran ordered ndarray of the right dtype
+    is wrapped without copying its data.  The result is a view,
+    which shares the data with the ndarray, and cannot be resized
+    -- the generated code copies such values on assignment.
     """
 
-    def __new__(cls,a=[],dtype=None):
+    def __new__(cls,a=[],dtype=None,copy=True):
         obj = np.array(a,
                        dtype=dtype,
-                       copy=False,
+                       copy=copy_if_needed,
                        order="F",
-                       ndmin=2).view(cls).copy(order="F")
+                       ndmin=2).view(cls)
+        if copy:
+            obj = obj.copy(order="F")
         if obj.size == 0:
             obj.shape = (0,0)
         return obj
@@ -80,32 +92,62 @@ class matlabarray(np.ndarray):
         """ must define iter or char won't work"""
         return np.asarray(self).__iter__()
 
+    def __int__(self):
+        """A 1 by 1 array is a scalar, as in int(n) of a loop bound,
+        which numpy takes only of 0-d arrays"""
+        return int(self.item())
+
     def compute_indices(self,index):
-        if not isinstance(index,tuple):
+        """
+        Zero-based numpy subscripts for one-based index.  Integers
+        and slices which are within bounds map to basic indexing,
+        which gives views rather than copies.  Everything else is
+        converted to index arrays, so that an out of bounds
+        subscript raises IndexError, and __setitem__ can grow.
+        """
+        if index.__class__ is not tuple:
            index = index,
         if len(index) != 1 and len(index) != self.ndim:
             raise IndexError
         indices = []
         for i,ix in enumerate(index):
+            if ix.__class__ is int:
+                indices.append(ix-1)
+                continue
+            if len(index) == 1:
+                n = self.size
+            else:
+                n = self.shape[i]
             if ix.__class__ is end:
-                indices.append(self.shape[i]-1+ix.n)
+                indices.append(n-1+ix.n)
             elif ix.__class__ is slice:
                 if self.size == 0 and ix.stop is None:
                     raise IndexError
-                if len(index) == 1:
-                    n = self.size
+                start = 1 if ix.start is None else ix.start
+                stop = n if ix.stop is None else ix.stop
+                step = 1 if ix.step is None else ix.step
+                if start.__class__ is end:
+                    start = n+start.n
+                if stop.__class__ is end:
+                    stop = n+stop.n
+                if (_integral(start) and _integral(stop) and
+                        _integral(step) and
+                        1 <= start and stop <= n and step > 0):
+                    indices.append(slice(int(start)-1,int(stop),int(step)))
                 else:
-                    n = self.shape[i]
-                indices.append(np.arange((ix.start or 1)-1,
-                                          ix.stop  or n,
-                                          ix.step  or 1,
-                                          dtype=int))
+                    # stop is inclusive
+                    indices.append(np.arange(start-1,
+                                             stop-1+(1 if step > 0 else -1),
+                                             step,
+                                             dtype=int))
             else:
                 try:
                     indices.append(int(ix)-1)
                 except:
                     indices.append(np.asarray(ix).astype("int32")-1)
-        if len(indices) == 2 and isvector(indices[0]) and isvector(indices[1]):
+        if (len(indices) == 2 and
+            indices[0].__class__ is indices[1].__class__ is np.ndarray and
+            isvector(indices[0]) and isvector(indices[1])):
             indices[0].shape = (-1,1)
             indices[1].shape = (-1,)
         return tuple(indices)
@@ -116,7 +158,15 @@ class matlabarray(np.ndarray):
         return self.__getitem__(slice(i,j))
 
     def __getitem__(self,index):
-        return matlabarray(self.get(index))
+        a = self.get(index)
+        if a.__class__ is matlabarray and a.size:
+            if a.ndim == 2:
+                return a
+            if a.ndim == 1:
+                return a.reshape(1,-1)
+        elif isinstance(a,np.generic):
+            return np.array(a,ndmin=2).view(matlabarray)
+        return matlabarray(a,copy=False)
 
     def get(self,index):
         #import pdb; pdb.set_trace()
@@ -139,7 +189,7 @@ class matlabarray(np.ndarray):
         elif isinstance(ix,slice):
             n = ix.stop
         elif isinstance(ix,(list,np.ndarray)):
-            n = max(ix)+1
+            n = int(max(ix))+1
         else:
             assert 0,ix
         if not isinstance(n,int):
@@ -151,7 +201,7 @@ class matlabarray(np.ndarray):
         indices = self.compute_indices(index)
         try:
             if len(indices) == 1:
-                np.asarray(self).reshape(-1,order="F").__setitem__(indices,value)
+                self.setflat(indices,value)
             else:
                 np.asarray(self).__setitem__(indices,value)
         except (ValueError,IndexError):
@@ -182,17 +232,63 @@ class matlabarray(np.ndarray):
                     new_shape[-1] = n
                 else:
                     new_shape = [(1 if s==1 else n) for s in self.shape]
-                self.resize(new_shape,refcheck=0)
-                np.asarray(self).reshape(-1,order="F").__setitem__(indices,value)
+                self.grow(new_shape)
+                self.setflat(indices,value)
             else:
-                new_shape = list(self.shape)
-                if self.flags["C_CONTIGUOUS"]:
-                    new_shape[0] = self.sizeof(indices[0])
-                elif self.flags["F_CONTIGUOUS"]:
-                    new_shape[-1] = self.sizeof(indices[-1])
-                self.resize(new_shape,refcheck=0)
+                new_shape = [__builtin__.max(n,self.sizeof(ix))
+                             for n,ix in zip(self.shape,indices)]
+                self.grow(new_shape)
                 np.asarray(self).__setitem__(indices,value)
 
+    def setflat(self,indices,value):
+        """Stores value at the column-major indices of self"""
+        a = np.asarray(self)
+        if a.flags["F_CONTIGUOUS"]:
+            a.reshape(-1,order="F").__setitem__(indices,value)
+        else:
+            # reshape would return a copy
+            a.__setitem__(np.unravel_index(indices[0],a.shape,order="F"),
+                          value)
+
+    def grow(self,new_shape):
+        """
+        Resize self in place to new_shape, keeping each element
+        at its subscripts, and filling the new ones with zeros.
+
+        ndarray.resize reallocates the buffer, which is extended
+        in place whenever the allocator can do it, and keeps the
+        elements in memory order.  So appending to a vector, or
+        growing the outermost axis -- the columns of a fortran
+        ordered matrix, the rows of a C ordered one -- moves no
+        elements, and is amortized O(1) per element.  Growing any
+        other axis copies the array once, to C order, and further
+        rows are again appended in place.
+        """
+        a = np.asarray(self)
+        if a.flags["F_CONTIGUOUS"] and not a.flags["C_CONTIGUOUS"]:
+            # ndarray.resize keeps fortran order
+            pairs = zip(a.shape,new_shape)
+        else:
+            pairs = reversed(list(zip(a.shape,new_shape)))
+        # Elements stay in place if the stride of each axis along
+        # which they vary is the same before and after the resize
+        n = m = 1
+        for i,j in pairs:
+            if i > 1 and n != m:
+                break
+            n,m = n*i,m*j
+        else:
+            self.resize(new_shape,refcheck=0)
+            return
+        b = a.copy()
+        # A one-dimensional array is both C and fortran contiguous,
+        # and resizing it gives C order
+        self.resize(prod(new_shape,dtype=int),refcheck=0)
+        self.resize(new_shape,refcheck=0)
+        a = np.asarray(self)
+        a.fill(0)
+        a[tuple(slice(0,n) for n in b.shape)] = b
+
     def __repr__(self):
         return self.__class__.__name__ + repr(np.asarray(self))[5:]
 
@@ -200,18 +296,54 @@ class matlabarray(np.ndarray):
         return str(np.asarray(self))
  
     def __add__(self,other):
-        return matlabarray(np.asarray(self)+np.asarray(other))
+        return np.add(self,other,out=empty_like_result(self,other))
 
     def __neg__(self):
-        return matlabarray(np.asarray(self).__neg__())
+        return np.negative(self,out=empty_like_result(self))
+
+def empty(shape,dtype=float):
+    """
+    Uninitialized fortran ordered matlabarray, which owns its data,
+    so unlike a view it can grow.
+    """
+    return np.ndarray.__new__(matlabarray,shape,dtype,order="F")
+
+def empty_like_result(*args):
+    """Output array for an elementwise operation on args"""
+    args = [np.asarray(a) for a in args]
+    return empty(np.broadcast_shapes(*[a.shape for a in args]),
+                 np.result_type(*args))
 
 class end(object):
+    """
+    The subscript end+n.  The backend binds most ends to the size
+    of the array at compile time, and emits end() for the rest.
+    Instances are immutable, and those with small offsets are
+    cached, so end()-1 allocates nothing.
+    """
+    __slots__ = ("n",)
+
+    def __new__(cls,n=0):
+        try:
+            return _ends[n]
+        except KeyError:
+            obj = object.__new__(cls)
+            object.__setattr__(obj,"n",n)
+            if -64 <= n <= 64:
+                _ends[n] = obj
+            return obj
+
+    def __setattr__(self,name,value):
+        raise AttributeError("end is immutable")
+
     def __add__(self,n):
-        self.n = n
-        return self
+        return end(self.n+n)
+    __radd__ = __add__
+
     def __sub__(self,n):
-        self.n = -n
-        return self
+        return end(self.n-n)
+
+_ends = {}
 ####
 class cellarray(matlabarray):
     """
@@ -280,7 +412,7 @@ class cellstr(matlabarray):
         """
         obj = np.array(["".join(s) for s in a], 
                        dtype=object,
-                       copy=False,
+                       copy=copy_if_needed,
                        order="C",
                        ndmin=2).view(cls).copy(order="F")
         if obj.size == 0:
@@ -321,7 +453,7 @@ class char(matlabarray):
             a = "".join([chr(c) for c in a])
         obj = np.array(list(a),
                        dtype='|S1',
-                       copy=False,
+                       copy=copy_if_needed,
                        order="F",
                        ndmin=2).view(cls).copy(order="F")
         if obj.size == 0:
@@ -345,7 +477,7 @@ class struct(object):
         for i in range(0,len(args),2):
             setattr(self,str(args[i]),args[i+1])
 
-NA = numpy.NaN
+NA = numpy.nan
 
 def abs(a):
     return numpy.abs(a)
@@ -362,11 +494,23 @@ def arange(start,stop,step=1,**kwargs):
     >>> size(a)
     matlabarray([[ 1, 10]])
     """
-    expand_value = 1 if step > 0 else -1
-    return matlabarray(np.arange(start,
-                                 stop+expand_value,
-                                 step,
-                                 **kwargs).reshape(1,-1),**kwargs)
+    # 1 by 1 arrays, as n in 1:n, are scalars -- numpy 2 takes only
+    # 0-d arrays
+    start, stop, step = [v.item() if isinstance(v, np.ndarray) else v
+                         for v in (start, stop, step)]
+    if __builtin__.all(isinstance(v,(int,np.integer))
+                       for v in (start,stop,step)):
+        expand_value = 1 if step > 0 else -1
+        return matlabarray(np.arange(start,
+                                     stop+expand_value,
+                                     step,
+                                     **kwargs).reshape(1,-1),**kwargs)
+    # start + i*step, for i up to n, which is rounded down, so that
+    # 1:2.5 is 1 2, as the range(1,int(2.5) + 1) of a counted loop.
+    # Within a tolerance, lest 0:0.1:0.3 lose its last element.
+    n = int(np.floor((stop - start) / step + 1e-10))
+    return matlabarray((start + step*np.arange(__builtin__.max(n+1,0)))
+                       .reshape(1,-1),**kwargs)
 def concat(args):
     """
     >>> concat([1,2,3,4,5] , [1,2,3,4,5]])
@@ -389,7 +533,7 @@ def clc():
     pass
 
 def copy(a):
-    return matlabarray(np.asanyarray(a).copy(order="F"))
+    return matlabarray(a)
 
 def deal(a,**kwargs):
     #import pdb; pdb.set_trace()
@@ -527,6 +671,10 @@ def length(a):
     except ValueError:
         return 1
 
+def loadmat(*args,**kwargs):
+    from scipy.io import loadmat as _loadmat
+    return _loadmat(*args,**kwargs)
+
 try:
     def load(a):
         return loadmat(a) # FIXME
@@ -560,7 +708,9 @@ def ones(*args,**kwargs):
         return 1
     if len(args) == 1:
         args += args
-    return matlabarray(np.ones(args,order="F",**kwargs))
+    a = empty(args,**kwargs)
+    a.fill(1)
+    return a
 
 #def primes2(upto):
 #    primes=np.arange(2,upto+1)
@@ -637,6 +787,7 @@ def rows(a):
     return np.asarray(a).shape[0]
 
 def schur(a):
+    from scipy.linalg import schur as _schur
     return matlabarray(_schur(np.asarray(a)))
 
 def size(a, b=0, nargout=1):
@@ -645,7 +796,7 @@ def size(a, b=0, nargout=1):
     matlabarray([[4, 4]])
     """
     s = np.asarray(a).shape
-    if s is ():
+    if s == ():
         return 1 if b else (1,)*nargout
     # a is not a scalar
     try:
@@ -699,7 +850,9 @@ def toc(t):
 def true(*args):
     if len(args) == 1:
         args += args
-    return matlabarray(np.ones(args,dtype=bool,order="F"))
+    a = empty(args,dtype=bool)
+    a.fill(True)
+    return a
 
 def version():
     return char('0.29')
@@ -709,7 +862,14 @@ def zeros(*args,**kwargs):
         return 0.0
     if len(args) == 1:
         args += args
-    return matlabarray(np.zeros(args,**kwargs))
+    # as in matlab, negative sizes are taken for zero
+    a = empty([__builtin__.max(n,0) for n in args],**kwargs)
+    a.fill(0)
+    return a
+
+def gamma(*args,**kwargs):
+    from scipy.special import gamma as _gamma
+    return _gamma(*args,**kwargs)
 
 def isa(a,b):
     return True
@@ -718,9 +878,13 @@ def print_usage():
     raise Exception
 
 def function(f):
+    """
+    Decorates the generated functions which use nargin, and passes
+    nargin to f in kwargs.  Being local to the call, it is right
+    for recursive calls and calls from several threads.
+    """
     def helper(*args,**kwargs):
-        helper.nargin = len(args)
-        helper.varargin = cellarray(args)
+        kwargs["nargin"] = len(args)
         return f(*args,**kwargs)
     return helper
 
@@ -3,9 +3,8 @@
 
 from __future__ import print_function
 
-import py_compile
-import tempfile
 import fnmatch
+import itertools
 import tarfile
 import sys
 import os
@@ -15,7 +14,13 @@ from os.path import basename, splitext
 from . import options
 from . import parse
 from . import resolve
+from . import prealloc
+from . import copies
+from . import infer
+from . import vectorize
 from . import backend
+from . import cache
+from . import timing
 from . import version
 
 def print_header(fp):
@@ -26,13 +31,141 @@ def print_header(fp):
     print("from libsmop import *", file=fp)
     print("#", options.filename, file=fp)
 
+def translate(filename, buf=None):
+    """
+    Translate one .m file and return the generated python text, or
+    None if there is nothing to write.  The source text is buf, if
+    given, or else it is read from filename.  With -j N this runs in
+    the worker processes, each keeping its own lexer and parser, so
+    it must not touch the output files.
+    """
+    options.filename = filename
+    timing.start_file(filename)
+    with timing.phase("read"):
+        if buf is None:
+            buf = open(filename).read()
+        buf = buf.replace("\r\n", "\n")
+    # FIXME buf = buf.decode("ascii", errors="ignore")
+    use_cache = not options.no_cache and not options.no_backend
+    if use_cache:
+        key = cache.key(buf)
+        s = cache.get(key)
+        if s is not None:
+            return s
+    s = translate_source(buf)
+    if use_cache and s is not None:
+        cache.put(key, s)
+    return s
+
+def translate_source(buf, opaque=()):
+    """
+    Translate the source text buf, and return the generated python
+    text, or None.  The functions named in opaque are defined in the
+    same file, but not in buf, and may store into their arguments.
+    """
+    if buf[-1] != '\n':
+        buf += '\n'
+    if timing.enabled:
+        with timing.phase("lex"):
+            timing.lex(buf)
+    with timing.phase("parse"):
+        stmt_list = parse.parse(buf)
+
+    if not stmt_list:
+        return None
+    if not options.no_resolve:
+        with timing.phase("resolve"):
+            resolve.resolve(stmt_list)
+        with timing.phase("analysis"):
+            prealloc.prealloc(stmt_list)
+            if options.vectorize:
+                vectorize.vectorize(stmt_list)
+            copies.elide_copies(stmt_list, opaque)
+            if not options.no_analysis:
+                infer.infer(stmt_list)
+    if not options.no_backend:
+        with timing.phase("backend"):
+            return backend.backend(stmt_list)
+
+def translate_or_traceback(source):
+    """
+    Returns (filename, s, tb) for source, a pair of the arguments of
+    translate().  s is the result of translate() and tb the formatted
+    traceback, exactly one of them being meaningful.  Errors are
+    returned rather than raised, so that a failing file does not
+    break the pool, and the driver can report them in file order.
+    """
+    try:
+        return source[0], translate(*source), None
+    except Exception:
+        return source[0], None, traceback.format_exc()
+
+def selected(filename):
+    """True unless -g PATTERN is given and filename does not match"""
+    return (not options.glob_pattern or
+            fnmatch.fnmatch(filename, options.glob_pattern))
+
+def list_files():
+    """Yields (filename, None) for the .m files of the file list"""
+    for filename in options.filelist:
+        if not filename.endswith(".m"):
+            print("\tIgnored: '%s' (unexpected file type)" % filename)
+        elif basename(filename) in options.xfiles:
+            if options.verbose:
+                print("\tExcluded: '%s'" % filename)
+        elif selected(filename):
+            yield filename, None
+
+def read_archive(archive):
+    """
+    Yields (name, text) for the .m members of archive, which is read
+    as a stream, decompressing it on the fly if needed, so that
+    neither the archive nor its members are ever kept whole, in
+    memory or on disk.  Members are taken in the order of the
+    archive, and filtered like the file list.
+    """
+    with tarfile.open(archive, "r|*") as tar:
+        for member in tar:
+            name = member.name
+            if (member.isfile() and name.endswith(".m") and
+                    basename(name) not in options.xfiles and selected(name)):
+                buf = tar.extractfile(member).read()
+                yield name, buf.decode("utf-8", "replace")
+
+def imap(pool, func, iterable, n):
+    """
+    pool.imap(func, iterable), reading at most n items of iterable
+    ahead.  Pool.imap itself takes them all at once, which would read
+    the whole archive into memory.
+    """
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, n))
+        if not batch:
+            return
+        for r in pool.imap(func, batch,
+                           chunksize=max(1, len(batch) // (pool._processes * 4))):
+            yield r
+
 def main():
     if "M" in options.debug:
         import pdb
         pdb.set_trace()
-    if not options.filelist:
+    if options.serve:
+        from . import server
+        server.serve()
+        return
+    if not options.filelist and not options.archive:
         options.parser.print_help()
         return
+    if parse.parser is None:
+        # Fail once rather than for each file if the tables are
+        # stale.  The worker processes inherit the parser.
+        parse.parser = parse.build()
+    if options.watch:
+        from . import watch
+        watch.watch()
+        return
     if options.output == "-":
         fp = sys.stdout
     elif options.output:
@@ -41,38 +174,56 @@ def main():
         fp = None
     if fp:
         print_header(fp)
+    if options.profile_phases:
+        # The phases of a file are timed in the process which
+        # translates it, and cached files have no phases
+        options.jobs = 1
+        options.no_cache = True
+        timing.start()
+
+    if options.archive:
+        todo = read_archive(options.archive)
+    else:
+        todo = list(list_files())
+    jobs = options.jobs
+    if jobs != 1 and (options.archive or len(todo) > 1):
+        import multiprocessing
+        jobs = jobs or multiprocessing.cpu_count()
+        # imap preserves the order of todo, so the output of -o
+        # is the same as in the serial case.
+        pool = multiprocessing.Pool(jobs)
+        results = imap(pool, translate_or_traceback, todo, jobs * 16)
+    else:
+        pool = None
+        results = (translate_or_traceback(source) for source in todo)
 
     nerrors = 0
-    for i, options.filename in enumerate(options.filelist):
+    i = 0
+    while True:
         try:
+            r = next(results, None)
+            if r is None:
+                break
+            options.filename, s, tb = r
             if options.verbose:
                 print(i, options.filename)
-            if not options.filename.endswith(".m"):
-                print("\tIgnored: '%s' (unexpected file type)" %
-                      options.filename)
+            i += 1
+            if tb:
+                nerrors += 1
+                sys.stdout.write(tb)
+                if options.strict:
+                    break
                 continue
-            if basename(options.filename) in options.xfiles:
-                if options.verbose:
-                    print("\tExcluded: '%s'" % options.filename)
-                continue
-            buf = open(options.filename).read()
-            buf = buf.replace("\r\n", "\n")
-            # FIXME buf = buf.decode("ascii", errors="ignore")
-            stmt_list = parse.parse(buf if buf[-1] == '\n' else buf + '\n')
-
-            if not stmt_list:
+            if s is None:
                 continue
-            if not options.no_resolve:
-                G = resolve.resolve(stmt_list)
-            if not options.no_backend:
-                s = backend.backend(stmt_list)
-            if not options.output:
-                f = splitext(basename(options.filename))[0] + ".py"
-                with open(f, "w") as fp:
-                    print_header(fp)
+            with timing.phase("write"):
+                if not options.output:
+                    f = splitext(basename(options.filename))[0] + ".py"
+                    with open(f, "w") as fp:
+                        print_header(fp)
+                        fp.write(s)
+                else:
                     fp.write(s)
-            else:
-                fp.write(s)
         except KeyboardInterrupt:
             break
         except:
@@ -82,5 +233,14 @@ def main():
                 break
         finally:
             pass
+    if pool:
+        pool.terminate()
+        pool.join()
+    if cache.written:
+        cache.evict()
+    if options.profile_phases:
+        timing.stop()
+        timing.write_report(options.profile_phases)
+        timing.print_slowest(options.profile_top)
     if nerrors:
         print("Errors:", nerrors)
@@ -8,10 +8,10 @@ from . node import extend
  
 @extend(node.node)
 def _graphviz(self,fp):
-    if getattr(self,"__slots__",False):
+    if getattr(self,"_fields",False):
         fp.write('"%s" [' % id(self))
         fp.write('label = "<f0> %s|' % self.__class__.__name__)
-        fp.write('|'.join(['<f%d> %s' % (i+1,s) for i,s in enumerate(self.__slots__)]))
+        fp.write('|'.join(['<f%d> %s' % (i+1,s) for i,s in enumerate(self._fields)]))
         fp.write('"]\n')
     else:
         fp.write('"%s" [' % id(self))
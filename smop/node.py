@@ -8,13 +8,6 @@ import copy,sys,inspect
 from . recipes import recordtype
 from . import options
 
-# def preorder(u):
-#     if isinstance(u,traversable):
-#         yield u
-#         for n in u:
-#             for t in preorder(n):
-#                 yield t
-
 def decode(self):
     r = ""
     s = self.name
@@ -30,12 +23,93 @@ def decode(self):
 def encode(s):
     return "".join(c+"_" if c.isupper() or c=="_" else c.upper() for c in s)
 
-def postorder(u):
-    if isinstance(u,node):
-        for v in u:
-            for t in postorder(v):
-                yield t
-        yield u # returns only traversible objects
+# Fields which never hold nodes, skipped by the traversals
+scalar_fields = frozenset("""name lineno column lexpos defs props value
+                             op nargout use_nargin use_varargin
+                             dummy copy kind""".split())
+
+_children = {}
+
+def children(cls):
+    """
+    Names of the fields of cls which may hold nodes, in reverse
+    order, or None if cls is a list.  Computed once per class.
+    """
+    try:
+        return _children[cls]
+    except KeyError:
+        pass
+    if issubclass(cls,list):
+        fields = None
+    else:
+        fields = ()
+        for k in cls.__mro__:
+            f = getattr(k,"_fields",None) or vars(k).get("__slots__")
+            if f:
+                fields = tuple(reversed([g for g in f
+                                         if g not in scalar_fields]))
+                break
+    _children[cls] = fields
+    return fields
+
+def _push(stack,u):
+    fields = _children.get(u.__class__,0)
+    if fields == 0:
+        fields = children(u.__class__)
+    if fields is None:
+        stack.extend(reversed(u))
+    else:
+        for f in fields:
+            stack.append(getattr(u,f))
+
+def preorder(u,cls=None):
+    """
+    Yields the nodes of the tree u, parents before children.  If
+    cls is given, yields only its instances, though all the tree is
+    traversed.  Iterative, so deep trees are fine.
+    """
+    stack = [u]
+    while stack:
+        u = stack.pop()
+        if isinstance(u,node):
+            if cls is None or isinstance(u,cls):
+                yield u
+            _push(stack,u)
+
+def copy_tree(u):
+    """
+    Copy of the tree u, for use in one more place of the tree, as
+    the passes rewrite nodes in place.  The nodes are new, the other
+    fields, such as the defs of idents, are shared.
+    """
+    if not isinstance(u,node):
+        return u
+    fields = children(u.__class__)
+    if fields is None:
+        return u.__class__(copy_tree(v) for v in u)
+    v = copy.copy(u)
+    for f in fields:
+        setattr(v,f,copy_tree(getattr(u,f)))
+    return v
+
+_parent = object() # marks the parent below it on the stack
+
+def postorder(u,cls=None):
+    """
+    Yields the nodes of the tree u, children before parents.  See
+    preorder.
+    """
+    stack = [u]
+    while stack:
+        u = stack.pop()
+        if u is _parent:
+            u = stack.pop()
+            if cls is None or isinstance(u,cls):
+                yield u # returns only traversible objects
+        elif isinstance(u,node):
+            stack.append(u)
+            stack.append(_parent)
+            _push(stack,u)
 
 def extend(cls):
     return lambda f: (setattr(cls,f.__name__,f) or f)
@@ -53,33 +127,7 @@ def exceptions(f):
     return wrapper
 
 class node(object):
-    def become(self,other):
-        class Wrapper(self.__class__):
-            def __copy__(self):
-                other = object.__getattribute__(self,"other")
-                return copy.copy(other)
-            def __getattribute__(self,name):
-                other = object.__getattribute__(self,"other")
-                return getattr(other,name)
-            def __setattr__(self,name,value):
-                other = object.__getattribute__(self,"other")
-                return setattr(other,name,value)
-            def __iter__(self):
-                other = object.__getattribute__(self,"other")
-                return iter(other)
-            #def __hash__(self):
-            #    other = object.__getattribute__(self,"other")
-            #    return id(other)
-            def __repr__(self):
-                other = object.__getattribute__(self,"other")
-                return repr(other)
-            def __len__(self):
-                other = object.__getattribute__(self,"other")
-                return len(other)
-        assert self != other
-        self.other = other
-        self.__class__ = Wrapper
-
+    __slots__ = ()
     def _type(self):
         raise AttributeError("_type")
 
@@ -87,19 +135,21 @@ class node(object):
 ######### LISTS
 
 class concat_list(node,list):
-    pass
+    __slots__ = ()
 
 class global_list(node,list):
     """space-separated list of variables used in GLOBAL statement"""
-    pass
+    __slots__ = ()
 
 class expr_list(node,list):
+    __slots__ = ()
     def __str__(self):
         return ",".join([str(t) for t in self])
     def __repr__(self):
         return "expr_list(%s)" % list.__repr__(self)
 
 class stmt_list(node,list):
+    __slots__ = ()
     def __str__(self):
         return "\n".join([str(t) for t in self])
     def __repr__(self):
@@ -112,33 +162,41 @@ class stmt_list(node,list):
 #
 #  ATOMS
 
-class atom(node): pass
+class atom(node):
+    __slots__ = ()
 
 class string(atom,recordtype("string", "value lineno lexpos", default=None)):
+    __slots__ = ()
     def __str__(self):
         return "'%s'" % self.value
 
 class logical(atom,recordtype("logical", "value lineno lexpos", default=None)):
-    pass
+    __slots__ = ()
 
 class number(atom,recordtype("number","value lineno lexpos",default=None)):
+    __slots__ = ()
     def __str__(self):
         return str(self.value)
 
-class ident(atom,recordtype("ident","name lineno column lexpos defs props init",
-        default=None)):
+class ident(atom,recordtype("ident",
+                            "name lineno column lexpos defs props init kind",
+                            default=None)):
+    """Identifier.  The kind of its value, if known, is set by
+    infer.py"""
+    __slots__ = ()
     def __str__(self):
         return self.name
 
 class param(ident):
-    pass
+    __slots__ = ()
 
 ###########################
 #
 #  STATEMENTS
 #
 
-class stmt(node): pass
+class stmt(node):
+    __slots__ = ()
 
 # class call_stmt(stmt,recordtype("call_stmt","func_expr args ret")):
 #     """Sometimes called multiple assignment, call statements represent
@@ -152,10 +210,12 @@ class stmt(node): pass
 #                               str(self.args))
 
 class let(stmt,recordtype("let",
-                          "ret args lineno lexpos nargout",
+                          "ret args lineno lexpos nargout copy",
                           default=None)):
     """Assignment statement, except [x,y]=foo(x,y,z),
-    which is handled by call_stmt."""
+    which is handled by call_stmt.  If copy is False, the value
+    need not be copied, see copies.py"""
+    __slots__ = ()
     def __str__(self):
         return "%s=%s" % (str(self.ret), str(self.args))
     
@@ -166,78 +226,89 @@ class func_stmt(stmt,recordtype("func_stmt",
                                 args
                                 stmt_list
                                 use_nargin
+                                use_varargin
                                 """,
                                 default=None)):
-    pass
+    __slots__ = ()
 
 class lambda_expr(func_stmt):
-    pass
+    __slots__ = ()
 
 class function(stmt,recordtype("function","head body")):
-    pass
+    __slots__ = ()
 
 class for_stmt(stmt,recordtype("for_stmt","ident expr stmt_list")):
-    pass
+    __slots__ = ()
 
 class DO_STMT(stmt,recordtype("DO_STMT","ident start stop stmt_list")):
-    pass
+    __slots__ = ()
 
 # We generate where_stmt to implement A(B==C) = D
 class where_stmt(stmt,recordtype("where_stmt","cond_expr stmt_list")):
-    pass
+    __slots__ = ()
 
 class if_stmt(stmt,recordtype("if_stmt","cond_expr then_stmt else_stmt")):
-    pass
+    __slots__ = ()
 
 class global_stmt(stmt,recordtype("global_stmt","global_list")):
+    __slots__ = ()
     def __str__(self):
         return "global %s" % str(self.global_list)
 
 class persistent_stmt(stmt,recordtype("persistent_stmt","global_list")):
+    __slots__ = ()
     def __str__(self):
         return "global %s" % str(self.global_list)
 
 class return_stmt(stmt,namedtuple("return_stmt","ret")):
+    __slots__ = ()
     def __str__(self):
         return "return"
 
 class comment_stmt(stmt,namedtuple("comment_stmt","value")):
+    __slots__ = ()
     def __str__(self):
         return self.value
 
 class end_stmt(stmt,namedtuple("end_stmt","dummy")):
+    __slots__ = ()
     def __str__(self):
         return "end"
 
 class continue_stmt(stmt,namedtuple("continue_stmt","dummy")):
+    __slots__ = ()
     def __str__(self):
         return "continue"
 
 class break_stmt(stmt,namedtuple("break_stmt","dummy")):
+    __slots__ = ()
     def __str__(self):
         return "break"
 
 class pass_stmt(stmt,namedtuple("pass_stmt","")):
+    __slots__ = ()
     def __str__(self):
         return "pass"
 
 class null_stmt(stmt,namedtuple("null_stmt","")):
+    __slots__ = ()
     def __str__(self):
         return ";"
 
 class expr_stmt(stmt,node,recordtype("expr_stmt","expr")):
+    __slots__ = ()
     def __str__(self):
         return str(self.expr)
 
 class while_stmt(stmt,node,recordtype("while_stmt","cond_expr stmt_list")):
-    pass
+    __slots__ = ()
 
 class try_catch(stmt,recordtype("try_catch","try_stmt catch_stmt finally_stmt")):
-    pass
+    __slots__ = ()
 
 class allocate_stmt(stmt,recordtype("allocate_stmt",
                                     "ident args")):
-    pass
+    __slots__ = ()
 
 #######################################333
 #
@@ -248,6 +319,7 @@ class funcall(node,recordtype("funcall","func_expr args nargout",default=None)):
     (a) Array references, both lhs and rhs
     (b) Function call expressions
     """
+    __slots__ = ()
     def __str__(self):
         return "%s(%s)" % (str(self.func_expr),
                            str(self.args))
@@ -261,6 +333,7 @@ class builtins(funcall):
     as class foo(builtins), and foo(x) is represented
     as foo(x).
     """
+    __slots__ = ()
 
     def __init__(self,*args,**kwargs):
         """
@@ -284,6 +357,7 @@ class builtins(funcall):
                               str(self.args))
 
 class arrayref(funcall):
+    __slots__ = ()
     def __repr__(self):
         return "%s%s[%s]" % (self.__class__, 
                              self.func_expr,
@@ -293,6 +367,7 @@ class arrayref(funcall):
 ########################## EXPR
 
 class expr(node,recordtype("expr","op args")):
+    __slots__ = ()
     def __str__(self):
         if self.op == ".":
             return "%s%s" % (str(self.args[0]),self.args[1])
@@ -380,14 +455,14 @@ builtins_list = [
 ]
 
 for name in builtins_list:
-    globals()[name] = type(name, (builtins,), {})
+    globals()[name] = type(name, (builtins,), {"__slots__": ()})
 
 #class cellarrayref(node,recordtype("cellarrayref","ident args")):
 class cellarrayref(funcall):
-    pass
+    __slots__ = ()
 
 class cellarray(expr):
-    pass
+    __slots__ = ()
 
 class matrix(builtins):
     """
@@ -397,6 +472,7 @@ class matrix(builtins):
     >>> print matrix()
     []
     """
+    __slots__ = ()
 #    def __init__(self,args=expr_list()):
 #        expr.__init__(self,op="[]",args=args)
 #    def __str__(self):
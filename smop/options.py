@@ -1,3 +1,4 @@
+import os
 import sys
 import argparse,textwrap
 from textwrap import dedent
@@ -33,7 +34,7 @@ Example:
 parser.add_argument("filelist", nargs="*", metavar="file.m", type=str)
 
 parser.add_argument("-A","--no-analysis", action="store_true", help="""
-skip analysis
+skip type and shape inference
 """)
 
 parser.add_argument("-B","--no-backend", action="store_true", help="""
@@ -62,6 +63,11 @@ parser.add_argument("-H","--no-header", action="store_true", help="""
 use it if you plan to concatenate the generated files
 """)
 
+parser.add_argument("-j", "--jobs", metavar="N", type=int, default=1, help="""
+translate N files in parallel, using a pool of N worker
+processes.  With -j0 the number of CPUs is used.
+""")
+
 parser.add_argument("-L", "--debug-lexer", action="store_true", help="""
 enable built-in debugging tools
 """)
@@ -106,8 +112,58 @@ parser.add_argument("-V", '--version', action='version', version=__version__)
 parser.add_argument("-v", "--verbose", action="store_true")
 
 parser.add_argument("-Z", "--archive", metavar="ARCHIVE.tar", help="""
-Read ".m" files from the archive; ignore other files.  Accepted
-format: "tar".  Accepted compression: "gzip", "bz2".
+Read ".m" files from the archive; ignore other files.  The archive
+is read as a stream, and is not extracted.  Accepted format: "tar".
+Accepted compression: "gzip", "bz2", "xz".
+""")
+
+parser.add_argument("--cache-dir", metavar="DIR", help="""
+keep translated files in DIR, and reuse them as long as neither
+the source file, nor smop, nor the options change.  The default
+is $XDG_CACHE_HOME/smop or ~/.cache/smop
+""")
+
+parser.add_argument("--cache-size", metavar="MB", type=int, default=256,
+                    help="""
+limit the size of the cache, dropping the least recently used
+files first (default 256)
+""")
+
+parser.add_argument("--no-cache", action="store_true", help="""
+neither read nor update the cache
+""")
+
+parser.add_argument("--vectorize", action="store_true", help="""
+replace simple elementwise for loops with whole-array statements,
+and report on stderr which loops were replaced, and which were not
+and why
+""")
+
+parser.add_argument("--serve", action="store_true", help="""
+run as a translation server, reading requests from stdin, or from
+the --socket, and translating them in a pool of -j N processes.
+See server.py for the protocol
+""")
+
+parser.add_argument("--socket", metavar="PATH", help="""
+with --serve, listen on the unix socket PATH instead of stdin
+""")
+
+parser.add_argument("--watch", action="store_true", help="""
+translate the .m files, and those under the directories, given on
+the command line, then poll them for changes, and translate again
+only the functions which changed.  Stop with ^C
+""")
+
+parser.add_argument("--profile-phases", metavar="REPORT", help="""
+record the time and memory spent in each phase of each file, write
+them to REPORT, as json, or as csv if REPORT ends with .csv, and list
+the slowest files on stderr.  Implies -j1 and --no-cache
+""")
+
+parser.add_argument("--profile-top", metavar="N", type=int, default=10,
+                    help="""
+list the N slowest files with --profile-phases (default 10)
 """)
 
 
@@ -115,6 +171,10 @@ args = parser.parse_args(namespace=sys.modules[__name__])
 
 xfiles = args.exclude.split(",") if args.exclude else []
 debug = args.debug.split(":") if args.debug else []
+if not args.cache_dir:
+    cache_dir = os.path.join(os.environ.get("XDG_CACHE_HOME") or
+                             os.path.join(os.path.expanduser("~"), ".cache"),
+                             "smop")
 filename = ""
 
 def foo():
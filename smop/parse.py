@@ -1,7 +1,12 @@
 # SMOP compiler -- Simple Matlab/Octave to Python compiler
 # Copyright 2011-2016 Victor Leikehman
 
+import sys
 from ply import yacc
+try:
+    from sys import intern
+except ImportError:
+    pass # a builtin in python 2
 from . import lexer
 from . lexer import tokens, raise_exception
 from . import node
@@ -402,14 +407,9 @@ def p_expr_end(p):
 @exceptions
 def p_expr_ident(p):
     "ident : IDENT"
-    global use_nargin, use_varargin
-    if p[1] == "varargin":
-        use_varargin = 1
-    if p[1] == "nargin":
-        use_nargin = 1
     # import pdb; pdb.set_trace()
     p[0] = node.ident(
-        name=p[1],
+        name=intern(p[1]),
         lineno=p.lineno(1),
         column=p.lexpos(1) - p.lexer.lexdata.rfind("\n", 0, p.lexpos(1)),
         lexpos=p.lexpos(1),
@@ -491,7 +491,7 @@ def p_field_expr(p):
         op=".",
         args=node.expr_list([
             p[1], node.ident(
-                name=p[2], lineno=p.lineno(2), lexpos=p.lexpos(2))
+                name=intern(p[2]), lineno=p.lineno(2), lexpos=p.lexpos(2))
         ]))
 
 
@@ -527,9 +527,8 @@ def p_func_stmt(p):
     """
     # stmt_list of func_stmt is set below
     # marked with XYZZY
-    global ret_expr, use_nargin, use_varargin
+    global ret_expr
     ret_expr = node.expr_list()
-    use_varargin = use_nargin = 0
 
     if len(p) == 5:
         assert isinstance(p[3], node.expr_list)
@@ -584,7 +583,7 @@ def p_global_stmt(p):
                 | GLOBAL ident EQ expr SEMI
     """
     p[0] = node.global_stmt(p[2])
-    for ident in p[0]:
+    for ident in p[0].global_list:
         ident.props = "G"  # G=global
 
 
@@ -836,7 +835,58 @@ def p_error(p):
     raise_exception(SyntaxError,
                     ('Unexpected "%s" (parser)' % p.value),
                     new_lexer)
-parser = yacc.yacc(start="top")
+parser = None  # see build()
+
+
+def build():
+    """
+    Returns the parser, made of the LALR tables in smop/parsetab.py
+    which are shipped with the package.  The tables are never
+    generated or written here -- the grammar is only checked
+    against the signature recorded in the tables, and stale
+    tables are an error.  Regenerate them with make parsetab.py
+    """
+    pinfo = yacc.ParserReflect(dict(globals(), start="top"))
+    pinfo.get_all()
+    lr = yacc.LRTable()
+    try:
+        signature = lr.read_table(__package__ + ".parsetab")
+    except ImportError:
+        signature = None
+    except yacc.VersionError as e:
+        # Tables written by another version of ply.  Correct, but
+        # slow: the tables are generated in memory for each process.
+        sys.stderr.write("smop: %s, run 'make parsetab.py'\n" % e)
+        return yacc.yacc(start="top", debug=False, write_tables=False)
+    if signature != pinfo.signature():
+        raise ImportError("smop/parsetab.py is missing or out of date, "
+                          "run 'make parsetab.py' in the smop directory")
+    lr.bind_callables(pinfo.pdict)
+    return yacc.LRParser(lr, pinfo.error_func)
+
+
+def writetab(outputdir):
+    """Regenerates parsetab.py, see build()"""
+    yacc.yacc(start="top", tabmodule="parsetab", outputdir=outputdir,
+              debug=False)
+
+
+def find_nargin(t):
+    """
+    Sets use_nargin and use_varargin of the functions which refer
+    to nargin and varargin.  Function bodies are the statements
+    which follow func_stmt in the top level list.
+    """
+    f = None
+    for u in t:
+        if u.__class__ is node.func_stmt:
+            f = u
+        elif f is not None:
+            for v in node.preorder(u, node.ident):
+                if v.name == "nargin":
+                    f.use_nargin = True
+                elif v.name == "varargin":
+                    f.use_varargin = True
 
 
 @exceptions
@@ -845,13 +895,20 @@ def parse(buf):
         import pdb
         pdb.set_trace()
     global new_lexer  # used in main.main()
+    global parser
+    if parser is None:
+        parser = build()
     new_lexer = lexer.new()
     p = parser.parse(
         buf, tracking=1, debug=options.debug_parser, lexer=new_lexer)
+    if p:
+        find_nargin(p)
 
     if "P" in options.debug:
+        from . import backend
         for i, pi in enumerate(p):
-            print(i, pi.__class__.__name__, pi._backend())
+            print(i, pi.__class__.__name__,
+                  backend.backend(node.stmt_list([pi])))
 
 #    for i in range(len(p)):
 #        if isinstance(p[i], node.func_stmt):
@@ -0,0 +1,162 @@
+# smop -- Matlab to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Preallocation of arrays grown in for loops.
+
+In
+
+    x = [];
+    for k=1:n
+        x(k) = f(k);
+    end
+
+x grows by one element per iteration, and each growth may copy
+it.  Its final extent is known before the loop starts, though, so
+x = [] is replaced by x = zeros(1,n), and the loop stores into
+place.  The rewrite is done if
+
+- x = [] is the last statement before the loop, not counting
+  comments and other such x = [];
+- the loop is over 1:hi, and the body has neither break nor
+  return, so it runs to the end;
+- the body assigns x(k) unconditionally, where k is the loop
+  variable, not assigned in the body before, and hi does not
+  depend on x;
+- each use of x in the loop, assigned or read, has the form
+  x(...) with one subscript, without end.
+
+Then x ends up 1 by max(hi,0), as it would with growth, except if
+the loop does not run at all: x is 1 by 0 instead of 0 by 0.  The
+size is int(hi), as the loop is over range(1,int(hi) + 1).  Unless
+hi is a number or a variable, it is assigned to a temporary before
+x = [], and the loop is over 1:temporary, so that hi is evaluated
+once.
+
+With -v, each preallocated array is reported on stderr.
+"""
+
+from __future__ import print_function
+
+import sys
+
+from . import node
+from . import options
+
+TEMP = "_hi"  # not a matlab name
+
+def prealloc(t):
+    """Preallocates the arrays grown in the for loops of t, in
+    place.  Returns the number of arrays preallocated."""
+    n = 0
+    for s in node.preorder(t, node.stmt_list):
+        i = 0
+        while i < len(s):
+            u = s[i]
+            if u.__class__ is node.for_stmt and is_simple_loop(u):
+                run = list(empty_lets(s, i))
+                grown = [(j, let) for j, let in run
+                         if is_grown(u, let.ret.name)]
+                hi = u.expr.args[1]
+                if grown and hi.__class__ not in (node.number, node.ident):
+                    if can_hoist(hi, run, grown[-1][0]):
+                        hoist(s, u, *grown[-1])
+                        hi = u.expr.args[1]
+                        i += 1
+                    else:
+                        grown = []
+                for j, let in reversed(grown):
+                    let.args = node.funcall(
+                        func_expr=node.ident("zeros"),
+                        args=node.expr_list([node.number(1), size(hi)]))
+                    n += 1
+                    if options.verbose:
+                        print("%s:%s: preallocated %s=zeros(1,%s)" %
+                              (options.filename, let.lineno,
+                               let.ret.name, hi), file=sys.stderr)
+            i += 1
+    return n
+
+def can_hoist(hi, run, j):
+    """True unless hi uses one of the x = [] of run at or after s[j],
+    which it would be moved before"""
+    names = set(let.ret.name for k, let in run if k >= j)
+    return not any(v.name in names for v in node.preorder(hi, node.ident))
+
+def hoist(s, u, j, let):
+    """Assigns hi of loop u to a temporary at s[j], just before the
+    x = [] let, and loops up to the temporary, so that hi is
+    evaluated once, and its uses are nodes of their own."""
+    d = node.ident(name=TEMP, lineno=let.lineno)
+    s.insert(j, node.expr_stmt(expr=node.expr_list([
+        node.let(ret=d, args=u.expr.args[1], lineno=let.lineno,
+                 copy=False)])))
+    u.expr.args[1] = node.ident(name=TEMP, lineno=let.lineno, defs=(d,))
+
+def size(hi):
+    """The size of the array grown up to hi, truncated as the loop
+    range is, see loop_range in backend.  A new node, since the
+    later passes rewrite the nodes in place."""
+    if hi.__class__ is node.number and type(hi.value) is int:
+        return node.number(hi.value)
+    if hi.__class__ is node.ident:
+        hi = node.ident(name=hi.name, lineno=hi.lineno, column=hi.column,
+                        defs=hi.defs)
+    return node.expr(op="int", args=node.expr_list([hi]))
+
+def is_simple_loop(u):
+    """True if u is for k=1:hi, which runs to the end"""
+    return (u.expr.__class__ is node.expr and u.expr.op == ":" and
+            len(u.expr.args) == 2 and
+            u.expr.args[0].__class__ is node.number and
+            u.expr.args[0].value == 1 and
+            not any(True for v in node.preorder(u.stmt_list,
+                                                (node.break_stmt,
+                                                 node.return_stmt))))
+
+def empty_lets(s, i):
+    """Yields (j, s[j].expr[0]) for the x = [] statements s[j]
+    just before s[i], nearest first"""
+    while i > 0:
+        i -= 1
+        if s[i].__class__ in (node.comment_stmt, node.null_stmt):
+            continue
+        if not (s[i].__class__ is node.expr_stmt and len(s[i].expr) == 1):
+            return
+        let = s[i].expr[0]
+        if not (let.__class__ is node.let and
+                let.ret.__class__ is node.ident and
+                let.args.__class__ is node.matrix and not let.args.args):
+            return
+        yield i, let
+
+def is_grown(u, name):
+    """True if each use of name in for loop u is name(...) with one
+    subscript, and the body assigns name(k)"""
+    if any(v.name == name for v in node.preorder(u.expr, node.ident)):
+        return False
+    k = u.ident.name
+    refs = set()
+    for v in node.preorder(u.stmt_list, (node.arrayref, node.funcall)):
+        if v.func_expr.__class__ is node.ident and v.func_expr.name == name:
+            if (v.__class__ not in (node.arrayref, node.funcall) or
+                    len(v.args) != 1 or
+                    any(w.op == "end" for w in node.preorder(v.args,
+                                                             node.expr))):
+                return False
+            refs.add(id(v.func_expr))
+    if any(v.name == name and id(v) not in refs
+           for v in node.preorder(u.stmt_list, node.ident)):
+        return False
+    for s in u.stmt_list:
+        if (s.__class__ is node.expr_stmt and len(s.expr) == 1 and
+                s.expr[0].__class__ is node.let):
+            ret = s.expr[0].ret
+            if (ret.__class__ is node.arrayref and
+                    ret.func_expr.__class__ is node.ident and
+                    ret.func_expr.name == name and
+                    ret.args[0].__class__ is node.ident and
+                    ret.args[0].name == k and
+                    ret.args[0].defs == (u.ident,)):
+                return True
+    return False
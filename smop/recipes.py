@@ -87,6 +87,7 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
             '%(typename)s(%(argtxt)s)'
 
             __slots__  = %(field_names)r
+            _fields    = %(field_names)r
 
             def __init__(self, %(argtxt)s):
                 %(inittxt)s
@@ -98,10 +99,10 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
                 %(itertxt)s
 
             def __getitem__(self, index):
-                return getattr(self, self.__slots__[index])
+                return getattr(self, self._fields[index])
 
             def __setitem__(self, index, value):
-                return setattr(self, self.__slots__[index], value)
+                return setattr(self, self._fields[index], value)
 
             def todict(self):
                 'Return a new dict which maps field names to their values'
@@ -8,208 +8,380 @@ if i.defs:
 if i.defs is None:
     i is a definition (lhs)
 
-if i.defs == set():
+if i.defs == ():
     i is used but not defined.
     Typical for function calls.
 
-symtab is a temporary variable, which maps
-variable names (strings) to sets of ident
-instances, which possibly define the variable.
-It is used in if_stmt, for_stmt, and while_stmt.
+The _resolve and _lhs_resolve methods build a
+flowgraph, a control-flow graph whose blocks list
+the uses and definitions of variables in the order
+of evaluation.  Reaching definitions are then found
+by a worklist algorithm over the graph, and stored
+in the defs of the uses.
 """
 
-import copy
-import networkx as nx
+from collections import deque
 
 from . import node
 from . node import extend
 
-def as_networkx(t):
-    G = nx.DiGraph()
-    for u in node.postorder(t):
-        if u.__class__ in (node.ident, node.param):
-            uu = "%s_%s_%s" % (u.name, u.lineno, u.column)
-            # label = "%s\\n%s" % (uu, u.props if u.props else "")
-            G.add_node(uu, ident=u)
-            if u.defs:
-                for v in u.defs:
-                    if v.__class__ is node.ident:
-                        vv = "%s_%s_%s" % (v.name, v.lineno, v.column)
-                        G.add_node(vv, ident=v)
-                        if u.lexpos < v.lexpos:
-                            G.add_edge(uu, vv, color="red")
-                        else:
-                            G.add_edge(uu, vv, color="black")
-    return G
-
-
-
-def resolve(t, symtab=None, fp=None, func_name=None):
-    if symtab is None:
-        symtab = {}
-    do_resolve(t,symtab)
-    G = as_networkx(t)
-    for n in G.nodes():
-        print(n.__class__.__name__)
-        u = G.node[n]["ident"]
-        if u.props:
-            pass
-        elif G.out_edges(n) and G.in_edges(n):
-            u.props = "U" # upd
-            #print u.name, u.lineno, u.column
-        elif G.in_edges(n):
-            u.props = "D" # def
-        elif G.out_edges(n):
-            u.props = "R" # ref
+class defuse(object):
+    """
+    Def-use graph of the idents of a parse tree.  Vertices are
+    small integers, one per source position (name, lineno, column),
+    so that copies of an ident share a vertex.  Edges go from each
+    use to its definitions, and are kept as adjacency lists.
+    """
+    __slots__ = ("idents", "succ", "npred")
+
+    def __init__(self, t):
+        self.idents = []  # vertex -> ident (the last one seen)
+        self.succ = []    # vertex -> vertices of its defs
+        self.npred = []   # vertex -> number of uses
+        index = {}
+        def vertex(u):
+            k = (u.name, u.lineno, u.column)
+            try:
+                i = index[k]
+            except KeyError:
+                i = index[k] = len(self.idents)
+                self.idents.append(u)
+                self.succ.append([])
+                self.npred.append(0)
+                return i
+            self.idents[i] = u
+            return i
+        for u in node.postorder(t, node.ident):
+            if u.__class__ in (node.ident, node.param):
+                i = vertex(u)
+                if u.defs:
+                    for v in u.defs:
+                        if v.__class__ is node.ident:
+                            j = vertex(v)
+                            self.succ[i].append(j)
+                            self.npred[j] += 1
+
+    def __len__(self):
+        return len(self.idents)
+
+    def props(self, i):
+        if self.succ[i] and self.npred[i]:
+            return "U" # upd
+        elif self.npred[i]:
+            return "D" # def
+        elif self.succ[i]:
+            return "R" # ref
         else:
-            u.props = "F" # ???
-        G.node[n]["label"] = "%s\\n%s" % (n, u.props)
-    return G
+            return "F" # ???
+
+    def to_networkx(self):
+        import networkx as nx  # slow to import, so only when needed
+        G = nx.DiGraph()
+        def key(u):
+            return "%s_%s_%s" % (u.name, u.lineno, u.column)
+        for i, u in enumerate(self.idents):
+            G.add_node(key(u), ident=u,
+                       label="%s\\n%s" % (key(u), u.props))
+        for i, u in enumerate(self.idents):
+            for j in self.succ[i]:
+                v = self.idents[j]
+                if (u.lexpos or 0) < (v.lexpos or 0):
+                    G.add_edge(key(u), key(v), color="red")
+                else:
+                    G.add_edge(key(u), key(v), color="black")
+        return G
+
+def as_networkx(t):
+    return defuse(t).to_networkx()
+
+def resolve(t, fp=None, func_name=None):
+    cfg = flowgraph()
+    do_resolve(t,cfg)
+    cfg.leave()
+    cfg.solve()
+    g = defuse(t)
+    for i, u in enumerate(g.idents):
+        if not u.props:
+            u.props = g.props(i)
+    return g
+
+def do_resolve(t,cfg):
+    t._resolve(cfg)
+
+class flowgraph(object):
+    """
+    Control-flow graph for the reaching definitions analysis.  A
+    block is a list of (ident, is_def) pairs in the order of
+    evaluation; blocks and their successors are indexed by small
+    integers.  The current block is cur, or None after return,
+    break and continue, where the code is unreachable.
+    """
+    def __init__(self):
+        self.blocks = []
+        self.succ = []
+        self.cur = None
+        self.loops = []  # (head, exit) of the enclosing loops
+        self.catch = []  # catch blocks of the enclosing try_catch
+        self.ret = None  # ret of the current function
+
+    def new(self, *preds):
+        b = len(self.blocks)
+        self.blocks.append([])
+        self.succ.append([])
+        for a in preds:
+            self.edge(a, b)
+        return b
 
-def do_resolve(t,symtab):
-    t._resolve(symtab)
+    def edge(self, a, b):
+        if a is not None:
+            self.succ[a].append(b)
 
-def copy_symtab(symtab):
-    new_symtab = copy.copy(symtab)
-    for k,v in new_symtab.items():
-        new_symtab[k] = copy.copy(v)
-    return new_symtab
+    def use(self, u):
+        if self.cur is None:
+            self.cur = self.new()
+        self.blocks[self.cur].append((u, False))
 
+    def define(self, u):
+        if self.cur is None:
+            self.cur = self.new()
+        self.blocks[self.cur].append((u, True))
+
+    def checkpoint(self):
+        """Inside try, the state after each statement reaches the
+        catch block"""
+        if self.catch and self.cur is not None:
+            self.edge(self.cur, self.catch[-1])
+            self.cur = self.new(self.cur)
+
+    def leave(self):
+        """Falling off the end of a function uses its ret"""
+        if self.ret is not None and self.cur is not None:
+            self.ret._resolve(self)
+        self.cur = None
+
+    def solve(self):
+        """Finds the definitions reaching each use, and stores
+        them in its defs.  Sets of definitions are bit masks."""
+        index = {}  # id(ident) -> bit
+        defs = []   # bit -> ident
+        mask = {}   # name -> bits of all its definitions
+        for block in self.blocks:
+            for u, is_def in block:
+                if is_def and id(u) not in index:
+                    index[id(u)] = len(defs)
+                    mask[u.name] = mask.get(u.name, 0) | 1 << len(defs)
+                    defs.append(u)
+
+        n = len(self.blocks)
+        gen = [0] * n
+        kill = [0] * n
+        preds = [[] for b in range(n)]
+        for b, block in enumerate(self.blocks):
+            for u, is_def in block:
+                if is_def:
+                    kill[b] |= mask[u.name]
+                    gen[b] = gen[b] & ~mask[u.name] | 1 << index[id(u)]
+            for c in self.succ[b]:
+                preds[c].append(b)
+
+        reach_in = [0] * n
+        reach_out = gen[:]
+        work = deque(range(n))
+        queued = [True] * n
+        while work:
+            b = work.popleft()
+            queued[b] = False
+            x = 0
+            for a in preds[b]:
+                x |= reach_out[a]
+            reach_in[b] = x
+            x = gen[b] | x & ~kill[b]
+            if x != reach_out[b]:
+                reach_out[b] = x
+                for c in self.succ[b]:
+                    if not queued[c]:
+                        queued[c] = True
+                        work.append(c)
+
+        uses = {}  # id(ident) -> [ident, bits]
+        for b, block in enumerate(self.blocks):
+            x = reach_in[b]
+            for u, is_def in block:
+                if is_def:
+                    x = x & ~mask[u.name] | 1 << index[id(u)]
+                else:
+                    uses.setdefault(id(u), [u, 0])[1] |= x & mask.get(u.name, 0)
+        for u, x in uses.values():
+            d = []
+            while x:
+                low = x & -x
+                d.append(defs[low.bit_length() - 1])
+                x ^= low
+            u.defs = tuple(d) # () is shared
 
 @extend(node.arrayref)
 @extend(node.cellarrayref)
 @extend(node.funcall)
-def _lhs_resolve(self,symtab):
+def _lhs_resolve(self,cfg):
     # Definitely lhs array indexing.  It's both a ref and a def.
     # Must properly handle cases such as foo(foo(17))=42
     # Does the order of A and B matter?
-    self.func_expr._resolve(symtab) # A
-    self.args._resolve(symtab)      # B
-    self.func_expr._lhs_resolve(symtab)
+    self.func_expr._resolve(cfg) # A
+    self.args._resolve(cfg)      # B
+    self.func_expr._lhs_resolve(cfg)
 
-
-
 @extend(node.expr)
-def _lhs_resolve(self,symtab):
+def _lhs_resolve(self,cfg):
     if self.op == ".": # see setfield
-        self.args._resolve(symtab)
-        self.args[0]._lhs_resolve(symtab)
+        self.args._resolve(cfg)
+        self.args[0]._lhs_resolve(cfg)
     elif self.op == "[]":
         for arg in self.args:
-            arg._lhs_resolve(symtab)
-
+            arg._lhs_resolve(cfg)
+
 @extend(node.expr_stmt)
-def _resolve(self,symtab):
-    self.expr._resolve(symtab)
-
+def _resolve(self,cfg):
+    self.expr._resolve(cfg)
+
 @extend(node.for_stmt)
-def _resolve(self,symtab):
-    symtab_copy = copy_symtab(symtab)
-    self.ident._lhs_resolve(symtab)
-    self.expr._resolve(symtab)
-    self.stmt_list._resolve(symtab)
-    self.stmt_list._resolve(symtab) # 2nd time, intentionally
-    # Handle the case where FOR loop is not executed
-    for k,v in symtab_copy.items():
-        symtab.setdefault(k,[]).append(v)
-
+def _resolve(self,cfg):
+    self.expr._resolve(cfg)
+    head = cfg.new(cfg.cur)
+    exit = cfg.new(head) # also when FOR loop is not executed
+    cfg.cur = cfg.new(head)
+    self.ident._lhs_resolve(cfg)
+    cfg.loops.append((head,exit))
+    self.stmt_list._resolve(cfg)
+    cfg.loops.pop()
+    cfg.edge(cfg.cur,head)
+    cfg.cur = exit
+
 @extend(node.func_stmt)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
+    cfg.leave()
+    cfg.cur = cfg.new()
+    cfg.ret = self.ret
     if self.ident:
-        self.ident._resolve(symtab)
-    self.args._lhs_resolve(symtab)
-    self.ret._resolve(symtab)
-
+        self.ident._resolve(cfg)
+    self.args._lhs_resolve(cfg)
+
+@extend(node.lambda_expr)
+def _resolve(self,cfg):
+    # The body sees the definitions at this point, and its own
+    # definitions do not leak out.
+    here = cfg.cur
+    cfg.cur = cfg.new(here)
+    self.args._lhs_resolve(cfg)
+    self.ret._resolve(cfg)
+    cfg.cur = cfg.new(here)
+
 @extend(node.global_list)
 @extend(node.concat_list)
 @extend(node.expr_list)
-def _lhs_resolve(self,symtab):
+def _lhs_resolve(self,cfg):
     for expr in self:
-        expr._lhs_resolve(symtab)
-
+        expr._lhs_resolve(cfg)
+
 @extend(node.global_list)
 @extend(node.concat_list)
 @extend(node.expr_list)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
     for expr in self:
-        expr._resolve(symtab)
-
+        expr._resolve(cfg)
+
 @extend(node.global_stmt)
-def _resolve(self,symtab):
-    self.global_list._lhs_resolve(symtab)
-
+def _resolve(self,cfg):
+    self.global_list._lhs_resolve(cfg)
+
 @extend(node.ident)
-def _lhs_resolve(self,symtab):
-    symtab[self.name] = [self]
-
+def _lhs_resolve(self,cfg):
+    cfg.define(self)
+
 @extend(node.if_stmt)
-def _resolve(self,symtab):
-    symtab_copy = copy_symtab(symtab)
-    self.cond_expr._resolve(symtab)
-    self.then_stmt._resolve(symtab)
+def _resolve(self,cfg):
+    self.cond_expr._resolve(cfg)
+    cond = cfg.cur
+    cfg.cur = cfg.new(cond)
+    self.then_stmt._resolve(cfg)
+    then = cfg.cur
+    cfg.cur = cfg.new(cond)
     if self.else_stmt:
-        self.else_stmt._resolve(symtab_copy)
-    for k,v in symtab_copy.items():
-        symtab.setdefault(k,[]).append(v)
-
+        self.else_stmt._resolve(cfg)
+    cfg.cur = cfg.new(then,cfg.cur)
+
 @extend(node.let)
-def _lhs_resolve(self,symtab):
-    self.args._resolve(symtab)
-    self.ret._lhs_resolve(symtab)
-
+def _lhs_resolve(self,cfg):
+    self.args._resolve(cfg)
+    self.ret._lhs_resolve(cfg)
+
 @extend(node.let)
-def _resolve(self,symtab):
-    self.args._resolve(symtab)
-    self.ret._lhs_resolve(symtab)
-
+def _resolve(self,cfg):
+    self.args._resolve(cfg)
+    self.ret._lhs_resolve(cfg)
+
 @extend(node.null_stmt)
+def _resolve(self,cfg):
+    pass
+
 @extend(node.continue_stmt)
+def _resolve(self,cfg):
+    if cfg.loops:
+        cfg.edge(cfg.cur,cfg.loops[-1][0])
+        cfg.cur = None
+
 @extend(node.break_stmt)
-def _resolve(self,symtab):
-    pass
-
+def _resolve(self,cfg):
+    if cfg.loops:
+        cfg.edge(cfg.cur,cfg.loops[-1][1])
+        cfg.cur = None
+
 @extend(node.setfield) # a subclass of funcall
-def _resolve(self,symtab):
-    self.func_expr._resolve(symtab)
-    self.args._resolve(symtab)
-    self.args[0]._lhs_resolve(symtab)
-
+def _resolve(self,cfg):
+    self.func_expr._resolve(cfg)
+    self.args._resolve(cfg)
+    self.args[0]._lhs_resolve(cfg)
+
 @extend(node.try_catch)
-def _resolve(self,symtab):
-    self.try_stmt._resolve(symtab)
-    self.catch_stmt._resolve(symtab) # ???
-
+def _resolve(self,cfg):
+    catch = cfg.new(cfg.cur)
+    cfg.cur = cfg.new(cfg.cur)
+    cfg.catch.append(catch)
+    self.try_stmt._resolve(cfg)
+    cfg.catch.pop()
+    end = cfg.cur
+    cfg.cur = catch
+    self.catch_stmt._resolve(cfg)
+    cfg.cur = cfg.new(end,cfg.cur)
+    if self.finally_stmt:
+        self.finally_stmt._resolve(cfg)
+
 @extend(node.ident)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
     if self.defs is None:
-        self.defs = []
-    try:
-        self.defs += symtab[self.name]
-    except KeyError:
-        # defs == set() means name used, but not defined
-        pass
-
+        self.defs = ()
+    cfg.use(self)
+
 @extend(node.arrayref)
 @extend(node.cellarrayref)
 @extend(node.funcall)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
     # Matlab does not allow foo(bar)(bzz), so func_expr is usually
     # an ident, though it may be a field or a dot expression.
     if self.func_expr:
-        self.func_expr._resolve(symtab)
-    self.args._resolve(symtab)
+        self.func_expr._resolve(cfg)
+    self.args._resolve(cfg)
     #if self.ret:
-    #    self.ret._lhs_resolve(symtab)
-
+    #    self.ret._lhs_resolve(cfg)
+
 @extend(node.expr)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
     for expr in self.args:
-        expr._resolve(symtab)
-
+        expr._resolve(cfg)
+
 @extend(node.number)
 @extend(node.string)
 @extend(node.comment_stmt)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
         pass
 
 # @extend(node.call_stmt)
@@ -220,32 +392,34 @@ def _resolve(self,symtab):
 #     self.func_expr._resolve(symtab) # A
 #     self.args._resolve(symtab)      # B
 #     self.ret._lhs_resolve(symtab)
-
+
 @extend(node.return_stmt)
-def _resolve(self,symtab):
-    self.ret._resolve(symtab)
-        #symtab.clear()
+def _resolve(self,cfg):
+    self.ret._resolve(cfg)
+    cfg.cur = None
 
 @extend(node.stmt_list)
-def _resolve(self,symtab):
+def _resolve(self,cfg):
     for stmt in self:
-        stmt._resolve(symtab)
+        stmt._resolve(cfg)
+        cfg.checkpoint()
 
 @extend(node.where_stmt) # FIXME where_stmt ???
 @extend(node.while_stmt)
-def _resolve(self,symtab):
-    symtab_copy = copy_symtab(symtab)
-    self.cond_expr._resolve(symtab)
-    self.stmt_list._resolve(symtab)
-    self.cond_expr._resolve(symtab)
-    self.stmt_list._resolve(symtab)
-    # Handle the case where WHILE loop is not executed
-    for k,v in symtab_copy.items():
-        symtab.setdefault(k,[]).append(v)
+def _resolve(self,cfg):
+    head = cfg.new(cfg.cur)
+    cfg.cur = head
+    self.cond_expr._resolve(cfg)
+    exit = cfg.new(cfg.cur) # also when WHILE loop is not executed
+    cfg.cur = cfg.new(cfg.cur)
+    cfg.loops.append((head,exit))
+    self.stmt_list._resolve(cfg)
+    cfg.loops.pop()
+    cfg.edge(cfg.cur,head)
+    cfg.cur = exit
 
 @extend(node.function)
-def _resolve(self,symtab):
-    self.head._resolve(symtab)
-    self.body._resolve(symtab)
-    self.head.ret._resolve(symtab)
-
+def _resolve(self,cfg):
+    self.head._resolve(cfg)
+    self.body._resolve(cfg)
+    self.head.ret._resolve(cfg)
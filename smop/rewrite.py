@@ -9,7 +9,7 @@ from . node import extend
 def graphviz(t, fp, func_name):
     fp.write("digraph %s {\n" % func_name)
     fp.write('graph [rankdir="LR"];\n')
-    for u in node.postorder(t):
+    for u in node.postorder(t, node.ident):
         if u.__class__ in (node.ident, node.param):
             fp.write("%s [label=%s_%s_%s];\n" %
                      (u.lexpos, u.name, u.lineno, u.column))
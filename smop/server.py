@@ -0,0 +1,150 @@
+# SMOP compiler -- Simple Matlab/Octave to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Translation server, started by smop --serve.
+
+The server keeps a pool of -j N worker processes, started with the
+compiler imported and its lexer and parser built, so that a request
+costs only the translation itself.
+Requests and responses are json objects, one per line.  They are
+read from stdin and written to stdout, or, with --socket PATH,
+exchanged over the connections to a unix socket.
+
+A request is
+
+    {"id": 1, "filename": "foo.m", "source": "function foo ..."}
+
+where "filename" is a string, and "source" is a string, or may be
+omitted, and the file is then read from disk.  "id" is anything, and is returned as is.  The response is
+
+    {"id": 1, "filename": "foo.m", "python": "def foo ...",
+     "error": null, "diagnostics": ""}
+
+where "python" is the generated code, without the header, or null
+if there is nothing to generate or if translation failed, "error"
+is then the traceback, and "diagnostics" is what translation wrote
+to stdout and stderr.  Requests are translated concurrently, so the
+responses may come in a different order.
+"""
+
+from __future__ import print_function
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import traceback
+
+from . import lexer
+from . import main
+from . import options
+from . import parse
+
+def translate(request):
+    """Runs in the workers.  Returns the response to request."""
+    out = io.StringIO()
+    response = {"id": request.get("id"),
+                "filename": request.get("filename"),
+                "python": None, "error": None}
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            response["python"] = main.translate(request["filename"],
+                                                request.get("source"))
+    except Exception:
+        response["error"] = traceback.format_exc()
+    response["diagnostics"] = out.getvalue()
+    return response
+
+class session(object):
+    """Requests read from fin, answered on fout as they complete"""
+    def __init__(self, pool, fin, fout):
+        self.pool = pool
+        self.fin = fin
+        self.fout = fout
+        self.lock = threading.Lock()
+        self.pending = threading.Semaphore(0)
+        self.count = 0
+
+    def reply(self, response):
+        with self.lock:
+            self.fout.write(json.dumps(response) + "\n")
+            self.fout.flush()
+        self.pending.release()
+
+    def failed(self, request_id, filename):
+        def error_callback(e):
+            self.reply({"id": request_id, "filename": filename,
+                        "python": None, "error": repr(e),
+                        "diagnostics": ""})
+        return error_callback
+
+    def run(self):
+        for line in self.fin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("not an object")
+                if "filename" not in request:
+                    raise ValueError("no filename")
+                # open() of an int would read a file descriptor of
+                # the worker, and hang it
+                if not isinstance(request["filename"], str):
+                    raise ValueError("filename is not a string")
+                if not isinstance(request.get("source", ""), str):
+                    raise ValueError("source is not a string")
+            except ValueError as e:
+                self.count += 1
+                self.reply({"id": None, "filename": None, "python": None,
+                            "error": "bad request: %s" % e,
+                            "diagnostics": ""})
+                continue
+            self.count += 1
+            self.pool.apply_async(translate, (request,),
+                                  callback=self.reply,
+                                  error_callback=self.failed(
+                                      request.get("id"),
+                                      request.get("filename")))
+        for i in range(self.count):
+            self.pending.acquire()
+
+def serve():
+    import multiprocessing
+    if parse.parser is None:
+        parse.parser = parse.build()
+    lexer.new()  # the workers inherit the lexer, too
+    pool = multiprocessing.Pool(options.jobs or multiprocessing.cpu_count())
+    try:
+        if not options.socket:
+            session(pool, sys.stdin, sys.stdout).run()
+            return
+
+        class handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fout = io.TextIOWrapper(self.wfile, encoding="utf-8")
+                fin = io.TextIOWrapper(self.rfile, encoding="utf-8")
+                session(pool, fin, fout).run()
+
+        if os.path.exists(options.socket):
+            os.unlink(options.socket)
+        server = socketserver.ThreadingUnixStreamServer(options.socket,
+                                                        handler)
+        server.daemon_threads = True
+        # kill removes the socket, too
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.unlink(options.socket)
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,94 @@
+import io
+import unittest
+import parse
+import resolve
+import backend
+
+src = """
+function y = f(x)
+  y = 0;
+  for i=1:x
+    if i > 2
+      y = y + i;
+    elseif i > 1
+      continue
+    else
+      ;
+    end
+  end
+  while y > 10
+    y = y - 1;
+  end
+  try
+    y = g(y);
+  catch
+  end
+end
+"""
+
+class TestBackend(unittest.TestCase):
+    def test_b01(self):
+        """Code streamed to a file and to a string is the same"""
+        t = parse.parse(src)
+        resolve.resolve(t)
+        s = backend.backend(t)
+        t = parse.parse(src)
+        resolve.resolve(t)
+        fp = io.StringIO()
+        backend.emit(t, fp)
+        self.assertEqual(s, fp.getvalue())
+        for line in ("    for i in arange(1,x).reshape(-1):",
+                     "        if i > 2:",
+                     "        else:",
+                     "            if i > 1:",
+                     "    while y > 10:",
+                     "    try:",
+                     "    finally:"):
+            self.assertIn("\n" + line + "\n", s)
+
+    def test_b02(self):
+        """The output is written in chunks"""
+        fp = backend.chunks()
+        for i in range(20000):
+            fp.write("abc")
+        self.assertTrue(len(fp.chunks) > 1)
+        self.assertEqual(fp.getvalue(), "abc"*20000)
+
+    def test_b03(self):
+        """Subscripted values are copied on assignment"""
+        t = parse.parse("a=zeros(3);\nb=a(2:3);\nc=f(2:3);\n")
+        resolve.resolve(t)
+        s = backend.backend(t)
+        self.assertTrue("b=copy(a(" in s)
+        self.assertTrue("c=f(" in s)
+
+    def test_b04(self):
+        """Colon subscripts are slices"""
+        t = parse.parse("a(:,2:3)=1;\na(1:2:5)=2;\n")
+        resolve.resolve(t)
+        s = backend.backend(t)
+        self.assertTrue("a[:,2:3]=1" in s)
+        self.assertTrue("a[1:5:2]=2" in s)
+
+    def test_b05(self):
+        """end is bound to the innermost subscripted array"""
+        t = parse.parse("a(end+1)=1;\nb(2,end)=a(end);\n")
+        resolve.resolve(t)
+        s = backend.backend(t)
+        self.assertTrue("a[a.size + 1]=1" in s)
+        self.assertTrue("b[2,b.shape[1]]=a(a.size)" in s)
+
+    def test_b06(self):
+        """Only functions which use nargin are decorated"""
+        t = parse.parse("function y=f(x)\ny=x;\n"
+                        "function y=g(x,varargin)\ny=nargin+varargin{1};\n")
+        resolve.resolve(t)
+        s = backend.backend(t)
+        self.assertTrue("\ndef f(x=None,*args,**kwargs):\n" in s)
+        self.assertTrue("@function\ndef g(x=None,*varargin,**kwargs):\n"
+                        "    nargin = kwargs[\"nargin\"]\n"
+                        "    varargin = cellarray(varargin)\n" in s)
+        self.assertEqual(s.count("@function"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
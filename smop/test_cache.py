@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+import options
+import cache
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.saved = options.cache_dir, options.cache_size
+        options.cache_dir = tempfile.mkdtemp()
+        options.cache_size = 1  # MB
+        cache.written = 0
+
+    def tearDown(self):
+        shutil.rmtree(options.cache_dir)
+        options.cache_dir, options.cache_size = self.saved
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(dirpath, name))
+                   for dirpath, dirnames, filenames
+                   in os.walk(options.cache_dir) for name in filenames)
+
+    def test_c01(self):
+        """Stored entries are read back"""
+        cache.put("ab01", "x=1\n")
+        self.assertEqual(cache.get("ab01"), "x=1\n")
+        self.assertEqual(cache.get("ab02"), None)
+        self.assertEqual(cache.written, 4)
+
+    def test_c02(self):
+        """The cache is evicted as entries are stored"""
+        s = "x" * (64 * 1024)
+        for i in range(40):
+            cache.put("%04x" % i, s)
+        self.assertTrue(self.size() <= 1024 * 1024 + len(s) * 2)
+        self.assertTrue(cache.written < 1024 * 1024 // cache.EVICT_EVERY)
+        self.assertEqual(cache.get("%04x" % 39), s)
+        self.assertEqual(cache.get("0000"), None)
+
+if __name__ == "__main__":
+    unittest.main()
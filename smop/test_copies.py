@@ -0,0 +1,127 @@
+import unittest
+import parse
+import resolve
+import backend
+import copies
+import infer
+from libsmop import *
+
+def translate(src):
+    t = parse.parse(src)
+    resolve.resolve(t)
+    n = copies.elide_copies(t)
+    return n, backend.backend(t)
+
+def run(src, *args):
+    """Calls f, translated from src, with args"""
+    t = parse.parse(src)
+    resolve.resolve(t)
+    copies.elide_copies(t)
+    infer.infer(t)
+    env = {}
+    exec("from libsmop import *\n" + backend.backend(t), env)
+    return env["f"](*args)
+
+class TestCopies(unittest.TestCase):
+    def test_c01(self):
+        """No store into either side, no copy"""
+        n, s = translate("function r = f(y)\n"
+                         "  x = y;\n"
+                         "  z = x(2);\n"
+                         "  r = x + z;\n")
+        self.assertEqual(n, 2)
+        self.assertIn("x=y", s)
+        self.assertIn("z=x(2)", s)
+
+    def test_c02(self):
+        """A store into either side keeps the copy"""
+        n, s = translate("function r = f(y, n)\n"
+                         "  x = y;\n"
+                         "  x(1) = 0;\n"
+                         "  z = y;\n"
+                         "  for k=1:n\n"
+                         "    w = y;\n"
+                         "    y(k) = 1;\n"
+                         "  end\n"
+                         "  r = x;\n")
+        self.assertEqual(n, 0)
+        self.assertIn("x=copy(y)", s)
+        self.assertIn("z=copy(y)", s)
+        self.assertIn("w=copy(y)", s)
+        self.assertIn("r=copy(x)", s)
+
+    def test_c03(self):
+        """Functions which store into or return their parameters"""
+        n, s = translate("function f(y)\n"
+                         "  x = y;\n"
+                         "  g(x);\n"
+                         "  z = y;\n"
+                         "  w = h(z);\n"
+                         "  w(1) = 0;\n"
+                         "function g(p)\n"
+                         "  p(1) = 0;\n"
+                         "function p = h(p)\n")
+        self.assertEqual(n, 0)
+
+    def test_c04(self):
+        """A function of another file may store into its arguments"""
+        n, s = translate("function r = f(y)\n"
+                         "  x = y;\n"
+                         "  x = clampneg(x);\n"
+                         "  z = y;\n"
+                         "  w = numel(z);\n"
+                         "  r = y;\n")
+        self.assertIn("x=copy(y)", s)
+        self.assertIn("z=y", s)
+
+    def test_c05(self):
+        """Subscripted arguments are copied, unless the function
+        neither stores into them nor returns them"""
+        n, s = translate("function f(a)\n"
+                         "  g(a(2:4));\n"
+                         "  h(a(2:4));\n"
+                         "  k(a(2:4));\n"
+                         "  clampneg(a(2:4));\n"
+                         "  sum(a(2:4));\n"
+                         "function g(p)\n"
+                         "  p(1) = 9;\n"
+                         "function p = h(p)\n"
+                         "function k(p)\n"
+                         "  disp(p);\n")
+        self.assertIn("g(copy(a(", s)
+        self.assertIn("h(copy(a(", s)
+        self.assertIn("k(a(", s)
+        self.assertIn("clampneg(copy(a(", s)
+        self.assertIn("sum(a(", s)
+
+    def test_c06(self):
+        """A function does not store into the array it is passed a
+        slice of, and may grow the slice"""
+        a = run("function a = f()\n"
+                "  a = zeros(1,5);\n"
+                "  r = g(a(2:4));\n"
+                "  r = h(a(2:4));\n"
+                "end\n"
+                "function p = g(p)\n"
+                "  p(1) = 9;\n"
+                "end\n"
+                "function p = h(p)\n"
+                "  p(end+1) = 9;\n"
+                "end\n")
+        self.assertTrue(isequal(a, [[0, 0, 0, 0, 0]]))
+
+    def test_c07(self):
+        """Subscripted arguments may share the value of the array"""
+        n, s = translate("function r = f(y, c)\n"
+                         "  x = y;\n"
+                         "  g(x(2:3));\n"
+                         "  d = c;\n"
+                         "  clampneg(d{1});\n"
+                         "  r = numel(x) + numel(d);\n"
+                         "function g(p)\n"
+                         "  p(1) = 0;\n")
+        self.assertIn("x=copy(y)", s)
+        self.assertIn("d=copy(c)", s)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import numpy as np
+import parse
+import resolve
+import backend
+import infer
+import node
+
+def translate(src):
+    t = parse.parse(src)
+    resolve.resolve(t)
+    infer.infer(t)
+    return t, backend.backend(t)
+
+def kinds(t):
+    return dict((u.name, u.kind) for u in node.preorder(t, node.ident)
+                if u.defs is None)
+
+class TestInfer(unittest.TestCase):
+    def test_i01(self):
+        """Counted loops iterate over python ints"""
+        t, s = translate("function f(v)\n"
+                         "  n = numel(v);\n"
+                         "  for i=1:n\n"
+                         "    disp(i);\n"
+                         "  end\n"
+                         "  for j=1:2:10\n"
+                         "    disp(j);\n"
+                         "  end\n"
+                         "  for k=1:v\n"
+                         "    disp(k);\n"
+                         "  end\n")
+        self.assertIn("for i in map(np.int64,range(1,int(n) + 1)):", s)
+        self.assertIn("for j in map(np.int64,range(1,11,2)):", s)
+        self.assertIn("for k in arange(1,v).reshape(-1):", s)
+        self.assertEqual(kinds(t)["i"], "index")
+        self.assertEqual(kinds(t)["k"], "scalar")
+
+    def test_i02(self):
+        """Elements are read with item(), products of scalars are
+        python products"""
+        t, s = translate("function s = f(n)\n"
+                         "  x = zeros(1,10);\n"
+                         "  a = zeros(10,10);\n"
+                         "  s = 0;\n"
+                         "  for i=1:10\n"
+                         "    s = s + x(i)*a(i,2) + a(i);\n"
+                         "  end\n")
+        self.assertIn("s=s + x.item(i - 1) * a.item(i - 1,1) + a[i]", s)
+        self.assertEqual(kinds(t)["s"], None)
+
+    def test_i03(self):
+        """Kinds are joined over the definitions"""
+        t, s = translate("function f(y)\n"
+                         "  a = 1;\n"
+                         "  b = 2;\n"
+                         "  if y\n"
+                         "    a = 0.5;\n"
+                         "    b = 'b';\n"
+                         "  end\n"
+                         "  c = a * 2;\n"
+                         "  d = b;\n"
+                         "  x = zeros(1,5);\n"
+                         "  x(2,3) = c;\n")
+        k = kinds(t)
+        self.assertEqual(k["c"], "scalar")
+        self.assertEqual(k["d"], None)
+        self.assertIn("c=a * 2", s)
+        self.assertEqual([u.kind for u in node.preorder(t, node.ident)
+                          if u.name == "x"], ["vector", "matrix"])
+
+    def test_i04(self):
+        """The loop variable of a counted loop divides like a numpy
+        int, so that 1/0 is inf"""
+        t, s = translate("function s = f(x)\n"
+                         "  n = numel(x);\n"
+                         "  s = 0;\n"
+                         "  for k=1:n\n"
+                         "    s = s + 1/(k-1);\n"
+                         "  end\n"
+                         "end\n")
+        env = {}
+        exec("import numpy as np\n"
+             "def numel(x):\n"
+             "    return len(x)\n" + s, env)
+        with np.errstate(divide="ignore"):
+            self.assertEqual(env["f"]([1, 2, 3]), np.inf)
+
+    def test_i05(self):
+        """Any call may assign a matrix to a global, so globals are
+        of unknown kind, unless they are arrays"""
+        t, s = translate("function r = f()\n"
+                         "  global g v\n"
+                         "  g = 2;\n"
+                         "  v = zeros(1,3);\n"
+                         "  h();\n"
+                         "  r = g*g + v(2);\n")
+        self.assertEqual(kinds(t)["g"], None)
+        self.assertEqual(kinds(t)["v"], "matrix")
+        self.assertIn("dot(g,g) + v[2]", s)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -188,5 +188,15 @@ world"''')
         t = [tok.type for tok in self.lexer]
         self.assertEqual("SEMI",t[6])
 
+    def test170(self):
+        "new lexer does not inherit the state of the previous one"
+        self.lexer.input("for i=[1 (2\n")
+        t = [tok.type for tok in self.lexer]
+        lexer2 = lexer.new()
+        lexer2.input("a b\n")
+        t = [(tok.type,tok.lineno) for tok in lexer2]
+        u = [("IDENT",1),("IDENT",1),("SEMI",1)]
+        self.assertEqual(t,u)
+
 if __name__ == "__main__":
     unittest.main()
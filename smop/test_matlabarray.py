@@ -169,6 +169,75 @@ class test_matlabarray(unittest.TestCase):
                                     [0,1,1,0],
                                     [0,1,1,0],
                                     [0,0,0,0]]))
+
+    def test120(self):
+        """Add rows to a fortran ordered matrix, then store
+           by linear index"""
+        a = matlabarray([[1,3],
+                         [2,4]])
+        a[3,1:2] = [5,6]
+        a[4,1:2] = [7,8]
+        a[5] = 9
+        self.assertTrue(isequal (a,[[1,9],
+                                    [2,4],
+                                    [5,6],
+                                    [7,8]]))
+        a[1,3] = 10
+        self.assertTrue(isequal (a,[[1,9,10],
+                                    [2,4,0],
+                                    [5,6,0],
+                                    [7,8,0]]))
+
+    def test130(self):
+        """Wrap without copying, copy() makes a resizable array"""
+        b = np.zeros((2,2),order="F")
+        a = matlabarray(b,copy=False)
+        a[1,1] = 1
+        self.assertEqual(b[0,0], 1)
+        a = copy(a)
+        a[3,1] = 2
+        self.assertEqual(b[0,0], 1)
+        self.assertTrue(isequal (a,[[1,0],[0,0],[2,0]]))
+
+    def test140(self):
+        """Slices within bounds are views, ranges going down are not"""
+        a = matlabarray([[1,3,5],
+                         [2,4,6]])
+        b = a[2:3]
+        self.assertTrue(np.shares_memory(a,b))
+        self.assertTrue(isequal (b,[[2,3]]))
+        self.assertTrue(isequal (a[2,:],[[2,4,6]]))
+        self.assertTrue(isequal (a[3:1:-1],[[3,2,1]]))
+
+    def test150(self):
+        """end() counts all elements when there is one subscript"""
+        a = matlabarray([[1,3],
+                         [2,4]])
+        self.assertEqual(a[end()], 4)
+        self.assertEqual(a[end()-1], 3)
+        self.assertEqual(a[1,end()], 3)
+        self.assertTrue(isequal (a[2:end()],[[2,3,4]]))
+        self.assertTrue(end()-1 is end()-1)
+
+    def test160(self):
+        """Negative sizes are taken for zero"""
+        self.assertEqual(zeros(1,-1).shape,(1,0))
+        self.assertEqual(zeros(-2).shape,(0,0))
+
+    def test170(self):
+        """Ranges with float bounds"""
+        a = matlabarray([[1.,2,3,4,5,6]])
+        n = 6
+        self.assertTrue(isequal (a[1:np.float64(3)],[[1,2,3]]))
+        a[1:n/2] = 0
+        self.assertTrue(isequal (a,[[0,0,0,4,5,6]]))
+
+    def test171(self):
+        """Colon with float or 1 by 1 array bounds"""
+        self.assertTrue(isequal (arange(1,2.5),[[1,2]]))
+        self.assertTrue(isequal (arange(1,matlabarray(3)),[[1,2,3]]))
+        self.assertEqual(arange(0,0.3,0.1).size,4)
+        self.assertEqual(arange(0,1,0.5).size,3)
 if __name__ == "__main__":
     unittest.main()
 # vim:et:sw=4:si:
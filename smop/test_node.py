@@ -0,0 +1,27 @@
+import unittest
+import parse
+import node
+
+class TestNode(unittest.TestCase):
+    def test_n01(self):
+        """Preorder and postorder visit the same nodes"""
+        t = parse.parse("x = a(1) + b;\nif x\n  y = x;\nend\n")
+        u = list(node.preorder(t))
+        v = list(node.postorder(t))
+        self.assertIs(u[0], t)
+        self.assertIs(v[-1], t)
+        self.assertEqual(sorted(map(id,u)), sorted(map(id,v)))
+
+    def test_n02(self):
+        """Filter by class"""
+        t = parse.parse("x = a(1) + b;\n")
+        self.assertEqual([u.name for u in node.postorder(t,node.ident)],
+                         ["x","a","b"])
+
+    def test_n03(self):
+        """Deep trees do not hit the recursion limit"""
+        t = parse.parse("x=" + "+".join(["a"]*5000) + ";\n")
+        self.assertEqual(len(list(node.postorder(t,node.ident))), 5001)
+
+if __name__ == "__main__":
+    unittest.main()
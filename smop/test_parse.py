@@ -9,6 +9,10 @@ class TestParse(unittest.TestCase):
         t = parse.parse(s)
         self.assert_(t)
 
+    def test_p07(self):
+        """Shipped parsetab.py is up to date, see make parsetab.py"""
+        self.assertTrue(parse.build())
+
 # FIXME
 #   def test_p04(self):
 #       """Dot has higher precedence than other operations"""
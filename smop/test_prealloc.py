@@ -0,0 +1,108 @@
+import unittest
+import parse
+import resolve
+import backend
+import prealloc
+import copies
+import infer
+from libsmop import *
+
+def translate(src):
+    t = parse.parse(src)
+    resolve.resolve(t)
+    n = prealloc.prealloc(t)
+    return n, backend.backend(t)
+
+def run(src, *args, **env):
+    """Calls f, translated from src by all the passes, with args.
+    env holds the functions f calls."""
+    t = parse.parse(src)
+    resolve.resolve(t)
+    prealloc.prealloc(t)
+    copies.elide_copies(t)
+    infer.infer(t)
+    exec("from libsmop import *\n" + backend.backend(t), env)
+    return env["f"](*args)
+
+class TestPrealloc(unittest.TestCase):
+    def test_p01(self):
+        """Arrays grown by the loop are allocated before it"""
+        n, s = translate("function [x, y] = f(n)\n"
+                         "  x = [];\n"
+                         "  y = [];\n"
+                         "  for k=1:n\n"
+                         "    x(k) = k;\n"
+                         "    y(k) = x(k) + 1;\n"
+                         "  end\n")
+        self.assertEqual(n, 2)
+        self.assertIn("x=zeros(1,int(n))", s)
+        self.assertIn("y=zeros(1,int(n))", s)
+
+    def test_p02(self):
+        """Unless the final extent is not known"""
+        for loop in ("for k=1:n\n x(k) = numel(x);\nend\n",
+                     "for k=2:n\n x(k) = k;\nend\n",
+                     "for k=1:2:n\n x(k) = k;\nend\n",
+                     "for k=1:n\n if k > 2\n  x(k) = k;\n end\nend\n",
+                     "for k=1:n\n x(k) = k;\n if k > 2\n  break\n end\nend\n",
+                     "for k=1:n\n x(k+1) = k;\nend\n"):
+            n, s = translate("function x = f(n)\n  x = [];\n" + loop)
+            self.assertEqual(n, 0, loop)
+            self.assertIn("x=[]", s)
+
+    def test_p03(self):
+        """The loop bound is evaluated once"""
+        calls = []
+        def h():
+            calls.append(1)
+            return 3 - len(calls)
+        src = ("function x = f()\n"
+               "  x = [];\n"
+               "  for k=1:h()\n"
+               "    x(k) = k;\n"
+               "  end\n"
+               "end\n")
+        n, s = translate(src)
+        self.assertEqual(n, 1)
+        self.assertEqual(s.count("h()"), 1)
+        self.assertIn("x=zeros(1,int(_hi))", s)
+        x = run(src, h=h)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(isequal(x, [[1, 2]]))
+
+    def test_p04(self):
+        """Subscripted loop bounds are rewritten once by infer"""
+        x = run("function x = f()\n"
+                "  m = zeros(1,2);\n"
+                "  m(2) = 3;\n"
+                "  x = [];\n"
+                "  for k=1:m(2)\n"
+                "    x(k) = k;\n"
+                "  end\n"
+                "end\n")
+        self.assertTrue(isequal(x, [[1, 2, 3]]))
+
+    def test_p05(self):
+        """The size is truncated as the loop range is"""
+        src = ("function x = f(n)\n"
+               "  x = [];\n"
+               "  for k=1:n\n"
+               "    x(k) = k;\n"
+               "  end\n"
+               "end\n")
+        self.assertTrue(isequal(run(src, matlabarray(3)), [[1, 2, 3]]))
+        self.assertTrue(isequal(run(src, 2.5), [[1, 2]]))
+
+    def test_p06(self):
+        """Unless the bound uses an array which is emptied after
+        where it would be evaluated"""
+        n, s = translate("function [x, y] = f(n)\n"
+                         "  x = [];\n"
+                         "  y = [];\n"
+                         "  for k=1:numel(y)\n"
+                         "    x(k) = k;\n"
+                         "  end\n")
+        self.assertEqual(n, 0)
+
+if __name__ == "__main__":
+    unittest.main()
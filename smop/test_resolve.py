@@ -0,0 +1,60 @@
+import unittest
+import parse
+import resolve
+
+class TestResolve(unittest.TestCase):
+    def setUp(self):
+        self.t = parse.parse("a=1;\nb=a;\nx=1;\nx(2)=b;\n")
+        self.g = resolve.resolve(self.t)
+
+    def test_r01(self):
+        """One vertex per ident, edges go from uses to defs"""
+        self.assertEqual(len(self.g), 6)
+        a1,b2,a2 = self.g.idents[:3]
+        self.assertEqual((a1.name,a1.lineno), ("a",1))
+        self.assertEqual((a2.name,a2.lineno), ("a",2))
+        self.assertEqual(self.g.succ[2], [0])
+        self.assertEqual(self.g.npred[0], 1)
+
+    def test_r02(self):
+        """Props are set on the idents"""
+        self.assertEqual([u.props for u in self.g.idents],
+                         ["D","D","R","D","R","R"])
+
+    def test_r03(self):
+        """Export to networkx"""
+        try:
+            import networkx
+        except ImportError:
+            return
+        G = self.g.to_networkx()
+        self.assertEqual(sorted(G.edges()),
+                         [("a_2_3","a_1_1"),
+                          ("b_4_6","b_2_1"),
+                          ("x_4_1","x_3_1")])
+
+    def test_r04(self):
+        """Both branches of if reach the join"""
+        t = parse.parse("a=1;\nif c\n  a=2;\nelse\n  a=3;\nend\nb=a;\n")
+        resolve.resolve(t)
+        u = t[-1].expr[0].args
+        self.assertEqual([(d.name,d.lineno) for d in u.defs],
+                         [("a",3),("a",5)])
+
+    def test_r05(self):
+        """Loop-carried definitions, break and continue"""
+        t = parse.parse("a=1;\nfor i=1:n\n  b=a;\n  if b\n    break\n  end\n"
+                        "  a=2;\n  if a\n    continue\n  end\n  a=3;\nend\n")
+        resolve.resolve(t)
+        u = t[1].stmt_list[0].expr[0].args
+        self.assertEqual([d.lineno for d in u.defs], [1,7,11])
+
+    def test_r06(self):
+        """Each statement of try reaches catch"""
+        t = parse.parse("try\n  e=1;\n  e=2;\ncatch\n  f=e;\nend\n")
+        resolve.resolve(t)
+        u = t[0].catch_stmt[0].expr[0].args
+        self.assertEqual([d.lineno for d in u.defs], [2,3])
+
+if __name__ == "__main__":
+    unittest.main()
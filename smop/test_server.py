@@ -0,0 +1,52 @@
+import io
+import json
+import unittest
+import options
+import server
+
+class pool(object):
+    """Runs the requests at once, in this process"""
+    def apply_async(self, func, args, callback, error_callback):
+        try:
+            r = func(*args)
+        except Exception as e:
+            error_callback(e)
+        else:
+            callback(r)
+
+def serve(*requests):
+    fin = io.StringIO("".join(r if isinstance(r, str) else
+                              json.dumps(r) + "\n" for r in requests))
+    fout = io.StringIO()
+    server.session(pool(), fin, fout).run()
+    return [json.loads(line) for line in fout.getvalue().splitlines()]
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        options.no_cache = True
+
+    def test_s01(self):
+        """A request is answered with the generated code"""
+        r, = serve({"id": 1, "filename": "f.m",
+                    "source": "function y = f(x)\n  y = x;\n"})
+        self.assertEqual(r["id"], 1)
+        self.assertEqual(r["error"], None)
+        self.assertIn("def f(", r["python"])
+
+    def test_s02(self):
+        """Bad requests are answered, and the next ones too"""
+        rs = serve("[1]\n",
+                   {"id": 2},
+                   {"id": 3, "filename": 7},
+                   {"id": 4, "filename": "f.m", "source": 7},
+                   {"id": 5, "filename": "f.m", "source": "x = 1;\n"})
+        self.assertEqual(len(rs), 5)
+        for r in rs[:4]:
+            self.assertTrue(r["error"].startswith("bad request"), r)
+        self.assertIn("not a string", rs[2]["error"])
+        self.assertIn("not a string", rs[3]["error"])
+        self.assertEqual(rs[4]["id"], 5)
+        self.assertEqual(rs[4]["error"], None)
+
+if __name__ == "__main__":
+    unittest.main()
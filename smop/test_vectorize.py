@@ -0,0 +1,81 @@
+import unittest
+import parse
+import resolve
+import backend
+import vectorize
+import infer
+from libsmop import *
+
+def translate(src):
+    t = parse.parse(src)
+    resolve.resolve(t)
+    n = vectorize.vectorize(t)
+    return n, backend.backend(t)
+
+class TestVectorize(unittest.TestCase):
+    def test_v01(self):
+        """Elementwise loop becomes an assignment of a section"""
+        n, s = translate("function y = f(x, a, n)\n"
+                         "  for k=1:n\n"
+                         "    y(k) = a*x(k) + k;\n"
+                         "  end\n")
+        self.assertEqual(n, 1)
+        self.assertNotIn("for ", s)
+        self.assertIn("y[1:n]=multiply(a,x[1:n]) + arange(1,n)", s)
+
+    def test_v02(self):
+        """Loop-carried dependencies are left alone"""
+        for body in ("s = s + x(k);",        # scalar
+                     "y(k) = y(k-1) + 1;",   # k-1
+                     "y(k) = g(x(k));",      # unknown function
+                     "y(k) = x(k) && 1;",    # not elementwise
+                     "x(k,1) = 7; y(k) = x(2,k);",  # other element
+                     "y(:,k) = x*y(:,k);"):  # matrix product
+            n, s = translate("function y = f(x, n)\n"
+                             "  s = 0;\n"
+                             "  y = x;\n"
+                             "  for k=2:n\n"
+                             "    %s\n"
+                             "  end\n" % body)
+            self.assertEqual(n, 0, body)
+            self.assertIn("for k in", s)
+
+    def test_v03(self):
+        """The loop variable must be dead after the loop"""
+        n, s = translate("function y = f(x, n)\n"
+                         "  for k=1:n\n"
+                         "    y(k) = x(k);\n"
+                         "  end\n"
+                         "  y(k) = 0;\n")
+        self.assertEqual(n, 0)
+
+    def test_v04(self):
+        """Products which do not depend on the loop variable are left
+        as they are"""
+        n, s = translate("function y = f(x, v, w, n)\n"
+                         "  for k=1:n\n"
+                         "    y(k) = v*w + x(k);\n"
+                         "  end\n")
+        self.assertEqual(n, 1)
+        self.assertIn("y[1:n]=dot(v,w) + x[1:n]", s)
+
+    def test_v05(self):
+        """Each use of the range is a node of its own"""
+        t = parse.parse("function y = f(x)\n"
+                        "  m = zeros(1,2);\n"
+                        "  m(2) = 3;\n"
+                        "  y = x;\n"
+                        "  for k=1:m(2)\n"
+                        "    y(k) = x(k) + 1;\n"
+                        "  end\n"
+                        "end\n")
+        resolve.resolve(t)
+        self.assertEqual(vectorize.vectorize(t), 1)
+        infer.infer(t)
+        env = {}
+        exec("from libsmop import *\n" + backend.backend(t), env)
+        y = env["f"](matlabarray([[1., 2, 3, 4]]))
+        self.assertTrue(isequal(y, [[2, 3, 4, 4]]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+import watch
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dirname, "f.m")
+        self.mtime = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def write(self, buf):
+        with open(self.filename, "w") as fp:
+            fp.write(buf)
+        # the stamp changes, even within the resolution of mtime
+        self.mtime += 1
+        os.utime(self.filename, (self.mtime, self.mtime))
+
+    def test_w01(self):
+        """Chunks are numbered by their first line"""
+        chunks = watch.split("x = 1;\n"
+                             "function f(a)\n"
+                             "  b = a;\n"
+                             "  function [u,v] = g\n")
+        self.assertEqual([lineno for lineno, text in chunks], [1, 2, 4])
+        self.assertEqual(watch.function_names(chunks), set(["f", "g"]))
+
+    def test_w02(self):
+        """Only the changed functions are translated again"""
+        f = watch.source_file(self.filename)
+        self.write("function f(a)\n"
+                   "  b = a + 1;\n"
+                   "function g(a)\n"
+                   "  c = a * 2;\n")
+        self.assertEqual(f.update(), 2)
+        self.assertEqual(f.update(), None)
+        self.write("function f(a)\n"
+                   "  b = a + 3;\n"
+                   "function g(a)\n"
+                   "  c = a * 2;\n")
+        self.assertEqual(f.update(), 1)
+        self.assertIn("b=a + 3", f.text)
+        self.assertIn("# %s:4" % self.filename, f.text)
+
+    def test_w03(self):
+        """Functions which moved are not translated again"""
+        f = watch.source_file(self.filename)
+        self.write("function f(a)\n"
+                   "  b = a + 1;\n"
+                   "function g(a)\n"
+                   "  c = a * 2;\n")
+        f.update()
+        self.write("function f(a)\n"
+                   "  b = a + 1;\n"
+                   "  b = b + 1;\n"
+                   "function g(a)\n"
+                   "  c = a * 2;\n")
+        self.assertEqual(f.update(), 1)
+        self.assertIn("c=dot(a,2)\n# %s:5" % self.filename, f.text)
+        self.assertNotIn("# %s:4" % self.filename, f.text)
+
+if __name__ == "__main__":
+    unittest.main()
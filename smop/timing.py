@@ -0,0 +1,169 @@
+# SMOP compiler -- Simple Matlab/Octave to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Time and memory spent by the driver in each phase of each file,
+enabled by --profile-phases REPORT.
+
+The phases are
+
+    read      reading the source file
+    lex       tokenizing it
+    parse     parsing it, which lexes it again, see below
+    resolve   name resolution
+    analysis  prealloc, vectorize, copies and infer
+    backend   code generation
+    write     writing the generated code
+
+The parser pulls its tokens from the lexer one at a time, so that
+lexing is not a phase of its own.  To time it anyway, the source is
+tokenized once more, before it is parsed.
+
+For each phase, the wall time, the cpu time, the peak of the memory
+allocated by python during the phase (by tracemalloc, which slows
+everything down), and the peak resident size of the process so far
+are recorded.  At the end of the run, the report is written as
+json, or as csv if REPORT ends with .csv, and the slowest files are
+listed on stderr.
+"""
+
+from __future__ import print_function
+
+import contextlib
+import csv
+import json
+import sys
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+try:
+    from time import perf_counter, process_time
+except ImportError:  # python 2
+    from time import time as perf_counter, clock as process_time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+from . import lexer
+
+PHASES = ("read", "lex", "parse", "resolve", "analysis", "backend", "write")
+
+FIELDS = ("wall", "cpu", "peak_kb", "rss_kb")
+
+enabled = False
+traced = False  # the memory, too
+files = []  # [(filename, {phase: {field: value}})]
+
+def start(trace=True):
+    """Starts recording.  Without trace, or without tracemalloc, the
+    memory is not recorded, and the times are not slowed down by
+    tracemalloc."""
+    global enabled, traced
+    enabled = True
+    traced = trace and tracemalloc is not None
+    del files[:]
+    lexer.new()  # built once, not billed to the first file
+    if traced:
+        tracemalloc.start()
+
+def stop():
+    global enabled
+    enabled = False
+    if traced:
+        tracemalloc.stop()
+
+def start_file(filename):
+    if enabled:
+        files.append((filename, {}))
+
+def max_rss_kb():
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+@contextlib.contextmanager
+def phase(name):
+    """Records the time and memory of the block as phase name of
+    the current file.  Does nothing unless enabled."""
+    if not enabled or not files:
+        yield
+        return
+    if traced:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    t0 = perf_counter()
+    c0 = process_time()
+    try:
+        yield
+    finally:
+        c1 = process_time()
+        t1 = perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] - base if traced else 0
+        files[-1][1][name] = {"wall": t1 - t0,
+                              "cpu": c1 - c0,
+                              "peak_kb": peak / 1e3,
+                              "rss_kb": max_rss_kb()}
+
+def lex(buf):
+    """Tokenizes buf, and returns the number of tokens"""
+    lx = lexer.new()
+    lx.input(buf)
+    n = 0
+    while lx.token():
+        n += 1
+    return n
+
+def wall(phases):
+    return sum(v["wall"] for v in phases.values())
+
+def totals():
+    """{phase: {field: value}} over all files -- times are summed,
+    memory is the maximum"""
+    t = {}
+    for filename, phases in files:
+        for name, v in phases.items():
+            s = t.setdefault(name, dict.fromkeys(FIELDS, 0))
+            s["wall"] += v["wall"]
+            s["cpu"] += v["cpu"]
+            s["peak_kb"] = max(s["peak_kb"], v["peak_kb"])
+            s["rss_kb"] = max(s["rss_kb"], v["rss_kb"])
+    return t
+
+def write_report(filename):
+    if filename.endswith(".csv"):
+        with open(filename, "w") as fp:
+            w = csv.writer(fp)
+            w.writerow(("file", "phase") + FIELDS)
+            rows = files + [("TOTAL", totals())]
+            for f, phases in rows:
+                for name in PHASES:
+                    if name in phases:
+                        w.writerow([f, name] +
+                                   [phases[name][k] for k in FIELDS])
+    else:
+        report = {"files": [{"file": f, "wall": wall(phases),
+                             "phases": phases}
+                            for f, phases in files],
+                  "total": totals(),
+                  "max_rss_kb": max_rss_kb()}
+        with open(filename, "w") as fp:
+            json.dump(report, fp, indent=1, sort_keys=True)
+
+def print_slowest(n, fp=sys.stderr):
+    """Prints the n slowest files, with their time per phase"""
+    slowest = sorted(files, key=lambda f: wall(f[1]), reverse=True)[:n]
+    if not slowest:
+        return
+    print("%9s" % "total" +
+          "".join("%9s" % name for name in PHASES) + "  file (seconds)",
+          file=fp)
+    for f, phases in slowest:
+        print("%9.3f" % wall(phases) +
+              "".join("%9.3f" % phases[name]["wall"] if name in phases
+                      else "%9s" % "-" for name in PHASES) + "  " + f,
+              file=fp)
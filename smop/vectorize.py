@@ -0,0 +1,205 @@
+# smop -- Matlab to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Vectorization of elementwise for loops, enabled by --vectorize.
+
+A loop such as
+
+    for k=1:n
+        y(k) = a*x(k) + b;
+    end
+
+is replaced by the whole-array statement
+
+    y(1:n) = a.*x(1:n) + b;
+
+which the backend emits as y[1:n]=multiply(a,x[1:n]) + b.  A loop
+qualifies if its range is lo:hi or lo:step:hi, and its body consists
+of assignments to array elements only, where
+
+- the loop variable k is one subscript of each array reference
+  which depends on it, and appears nowhere else in the subscripts,
+  nor does a range such as a(k,2:3), or a colon, a(:,k);
+- every other use of k is as a value, which becomes the range;
+- the right hand sides call no functions, except a few elementwise
+  ones, and products, taken to be of scalars where they depend on
+  k;
+- no use inside the loop is reached by a definition inside the
+  loop, other than of an array at the same element k.
+
+The last condition, checked against the defs found by resolve,
+rules out loop-carried dependencies such as y(k)=y(k-1)+1, or a
+scalar accumulated across iterations.  Also, k must not be used
+after the loop, since the loop would leave it set to hi.
+
+Each for loop considered is reported on stderr, as vectorized or
+not, and why not.
+"""
+
+from __future__ import print_function
+
+import sys
+
+from . import node
+from . import options
+
+# Functions which are elementwise, and take one or two arrays
+elementwise = frozenset("""abs ceil exp fix log mod multiply round
+                           sqrt""".split())
+
+# Operators which are elementwise, see backend.optable
+operators = frozenset("""+ - ./ / .^ ^ < <= > >= == ~= != ~ ! & | parens
+                         """.split())
+
+class reject(Exception):
+    pass
+
+def vectorize(t):
+    """Vectorizes the for loops of the resolved tree t in place.
+    Returns the number of loops vectorized."""
+    uses = {}  # id of a def -> uses it reaches
+    for u in node.preorder(t, node.ident):
+        for d in u.defs or ():
+            uses.setdefault(id(d), []).append(u)
+    msgs = []  # inner loops come first, so sort by line
+    for s in list(node.postorder(t, node.stmt_list)):
+        body = []
+        for u in s:
+            if u.__class__ is node.for_stmt:
+                try:
+                    body.extend(vectorize_loop(u, uses))
+                    msgs.append((u.ident.lineno, u.ident.name, "vectorized"))
+                    continue
+                except reject as e:
+                    msgs.append((u.ident.lineno, u.ident.name,
+                                 "not vectorized: %s" % e))
+            body.append(u)
+        s[:] = body
+    for msg in sorted(msgs):
+        print("%s:%d: for %s %s" % ((options.filename,) + msg),
+              file=sys.stderr)
+    return sum(1 for msg in msgs if msg[2] == "vectorized")
+
+def vectorize_loop(u, uses):
+    """Returns the statements which replace the for loop u, or
+    raises reject"""
+    k = u.ident.name
+    if not (u.expr.__class__ is node.expr and u.expr.op == ":" and
+            len(u.expr.args) in (2, 3)):
+        raise reject("not a range")
+    inside = set(id(v) for v in node.preorder(u, node.ident))
+    for v in node.preorder(u.stmt_list, node.ident):
+        if v.name == k and v.defs and v.defs != (u.ident,):
+            raise reject("assigns %s" % k)
+    for v in uses.get(id(u.ident), ()):
+        if id(v) not in inside:
+            raise reject("%s is used after the loop" % k)
+    stored = set()
+    body = node.stmt_list()
+    for s in u.stmt_list:
+        if s.__class__ in (node.comment_stmt, node.null_stmt):
+            body.append(s)
+            continue
+        if not (s.__class__ is node.expr_stmt and len(s.expr) == 1 and
+                s.expr[0].__class__ is node.let):
+            raise reject("%s statement" % s.__class__.__name__)
+        s = s.expr[0]
+        if s.ret.__class__ is not node.arrayref:
+            raise reject("assigns %s" % s.ret)
+        stored.add(s.ret.func_expr.name)
+        let = node.let(ret=ref(s.ret, u, inside, True),
+                       args=value(s.args, u, inside),
+                       lineno=s.lineno, lexpos=s.lexpos)
+        body.append(node.expr_stmt(expr=node.expr_list([let])))
+    for v in node.preorder(u.expr, node.ident):
+        if v.name in stored:
+            raise reject("the range depends on %s" % v.name)
+    return body
+
+def ref(r, u, inside, lhs=False):
+    """Array reference r with the loop variable replaced by the
+    range of loop u"""
+    k = u.ident.name
+    if r.func_expr.__class__ is not node.ident:
+        raise reject("%s is not an array" % r.func_expr)
+    args = node.expr_list()
+    n = 0
+    for a in r.args:
+        if a.__class__ is node.ident and a.name == k:
+            args.append(node.copy_tree(u.expr))
+            n += 1
+        else:
+            # a range, or a bare colon, would not broadcast against
+            # the loop range, and makes the products matrix products
+            if (a.__class__ is node.expr and a.op == ":" or
+                    any(v.name == k for v in node.preorder(a, node.ident))):
+                raise reject("%s in a subscript of %s" %
+                             (a, r.func_expr.name))
+            invariant(a, u, inside)
+            args.append(a)
+    if n != 1:
+        if lhs:
+            raise reject("%s does not depend on %s" % (r, k))
+        invariant(r, u, inside)
+        return r
+    if not lhs:
+        # an earlier assignment in the loop must be of the same
+        # element, which is fine
+        for d in r.func_expr.defs or ():
+            if id(d) in inside and not same_element(d, r, u):
+                raise reject("%s is carried" % r.func_expr.name)
+    return node.arrayref(func_expr=r.func_expr, args=args)
+
+def same_element(d, r, u):
+    """True if d is the array of an assignment a(...)=... in the body
+    of loop u, with the same subscripts as the reference r"""
+    for s in u.stmt_list:
+        if (s.__class__ is node.expr_stmt and
+                s.expr[0].__class__ is node.let and
+                s.expr[0].ret.func_expr is d):
+            args = s.expr[0].ret.args
+            return (len(args) == len(r.args) and
+                    all(str(a) == str(b) for a, b in zip(args, r.args)))
+    return False
+
+def invariant(t, u, inside):
+    """Raises reject unless no definition inside loop u reaches
+    the uses in t"""
+    for v in node.preorder(t, node.ident):
+        for d in v.defs or ():
+            if id(d) in inside:
+                raise reject("%s is carried" % v.name)
+
+def value(t, u, inside):
+    """Expression t, evaluated for all the iterations of loop u"""
+    k = u.ident.name
+    cls = t.__class__
+    if cls in (node.number, node.string):
+        return t
+    if cls is node.ident:
+        if t.name == k:
+            return node.copy_tree(u.expr)
+        invariant(t, u, inside)
+        return t
+    if cls is node.expr and t.op in operators:
+        return node.expr(op=t.op,
+                         args=node.expr_list(value(a, u, inside)
+                                             for a in t.args))
+    if cls in (node.funcall, node.arrayref):
+        f = t.func_expr
+        if f.__class__ is node.ident and f.defs:
+            return ref(t, u, inside)
+        if f.__class__ is node.ident and f.name == "dot" and not any(
+                v.name == k for v in node.preorder(t.args, node.ident)):
+            # the same product in each iteration, of whatever shapes
+            invariant(t, u, inside)
+            return t
+        if f.__class__ is node.ident and f.name in elementwise | {"dot"}:
+            # In the loop, the arguments of dot are scalars
+            name = "multiply" if f.name == "dot" else f.name
+            return node.funcall(func_expr=node.ident(name),
+                                args=node.expr_list(value(a, u, inside)
+                                                    for a in t.args))
+        raise reject("calls %s" % f)
+    raise reject("%s expression" % getattr(t, "op", cls.__name__))
@@ -0,0 +1,193 @@
+# SMOP compiler -- Simple Matlab/Octave to Python compiler
+# Copyright 2011-2018 Victor Leikehman
+
+"""
+Incremental translation, started by smop --watch.
+
+The .m files of the file list, and those under the directories of
+the file list, are translated, and then polled for changes every
+INTERVAL seconds.  A file whose mtime or size changed is translated
+again, but only in part.  The file is split into chunks -- the
+statements before the first function, if any, and each function --
+and only the chunks whose text changed are parsed, resolved and
+emitted.  The code generated for the other chunks is reused.
+
+A chunk is translated apart from the rest of the file, so the calls
+to the other functions of the file are assumed to store into their
+arguments, see copies.py.  This may keep a few copies which a full
+translation would elide.  The generated code of a chunk which moved
+to other lines is reused, too, with its line number comments
+shifted.  When the functions of the file are renamed, added or
+removed, all of its chunks are emitted again.
+
+If a chunk fails to translate, as when the file uses nested
+functions, the whole file is translated at once.
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import time
+import traceback
+from os.path import basename, splitext
+
+from . import main
+from . import options
+
+INTERVAL = 1.0  # seconds
+
+FUNCTION = re.compile(r"^[ \t]*function\b", re.M)
+NAME = re.compile(r"function\s*(?:(?:\[[^\]]*\]|\w+)\s*=\s*)?(\w+)")
+
+def split(buf):
+    """Returns [(lineno, text)] of the chunks of buf"""
+    starts = [m.start() for m in FUNCTION.finditer(buf)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    chunks = []
+    lineno = 1
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(buf)
+        text = buf[start:end]
+        if text:
+            chunks.append((lineno, text))
+        lineno += text.count("\n")
+    return chunks
+
+def function_names(chunks):
+    names = set()
+    for lineno, text in chunks:
+        m = NAME.match(text.lstrip())
+        if m:
+            names.add(m.group(1))
+    return names
+
+class source_file(object):
+    """The last translation of a file, and of its chunks"""
+    def __init__(self, filename):
+        self.filename = filename
+        self.stamp = None   # (mtime, size) when last translated
+        self.names = None   # the functions of the file
+        self.chunks = {}    # text -> (lineno, generated code)
+        self.text = None    # generated code of the file
+        self.nchunks = 0
+
+    def update(self):
+        """Translates the file if it changed since the last call.
+        Returns the number of chunks translated, or None if the file
+        did not change."""
+        st = os.stat(self.filename)
+        stamp = (st.st_mtime, st.st_size)
+        if stamp == self.stamp:
+            return None
+        self.stamp = stamp
+        options.filename = self.filename
+        with open(self.filename) as fp:
+            buf = fp.read().replace("\r\n", "\n")
+        chunks = split(buf)
+        self.nchunks = len(chunks)
+        names = function_names(chunks)
+        if names != self.names:
+            self.names = names
+            self.chunks = {}
+        done = {}
+        n = 0
+        try:
+            for lineno, text in chunks:
+                if text in self.chunks:
+                    done[text] = self.chunks[text]
+                elif text not in done:
+                    # padded, to keep the line numbers of the file
+                    done[text] = (lineno, main.translate_source(
+                        "\n" * (lineno - 1) + text, names) or "")
+                    n += 1
+        except Exception:
+            self.chunks = {}
+            self.text = main.translate(self.filename, buf) or ""
+            return len(chunks)
+        self.chunks = done
+        self.text = "".join(self.shift(done[text][1], lineno - done[text][0])
+                            for lineno, text in chunks)
+        return n
+
+    def shift(self, s, delta):
+        """Adds delta to the line numbers in the comments of s"""
+        if not delta or options.no_numbers:
+            return s
+        pattern = r"^# %s:(\d+)$" % re.escape(self.filename)
+        return re.sub(pattern,
+                      lambda m: "# %s:%d" % (self.filename,
+                                             int(m.group(1)) + delta),
+                      s, flags=re.M)
+
+def list_files():
+    """The .m files of the file list, and under its directories"""
+    files = []
+    for name in options.filelist:
+        if os.path.isdir(name):
+            for dirpath, dirnames, filenames in os.walk(name):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, f)
+                             for f in sorted(filenames) if f.endswith(".m"))
+        elif name.endswith(".m"):
+            files.append(name)
+    return [f for f in files
+            if basename(f) not in options.xfiles and main.selected(f)]
+
+def write(f):
+    options.filename = f.filename
+    with open(splitext(basename(f.filename))[0] + ".py", "w") as fp:
+        main.print_header(fp)
+        fp.write(f.text)
+
+def write_all(files):
+    """Writes all of files to -o FILE.py"""
+    options.filename = ""
+    with open(options.output, "w") as fp:
+        main.print_header(fp)
+        for f in files:
+            fp.write(f.text)
+
+def watch():
+    state = {}
+    try:
+        while True:
+            poll(state)
+            time.sleep(INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+def poll(state):
+    """Translates the files which changed since the last poll.  state
+    maps the names of the files to their source_file."""
+    files = []
+    changed = False
+    for filename in list_files():
+        f = state.get(filename) or source_file(filename)
+        state[filename] = f
+        try:
+            n = f.update()
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            continue
+        if f.text is None:
+            continue
+        files.append(f)
+        if n is None:
+            continue
+        changed = True
+        print("%s: %d of %d chunks translated" % (filename, n, f.nchunks),
+              file=sys.stderr)
+        sys.stdout.flush()
+        if options.output == "-":
+            sys.stdout.write(f.text)
+        elif not options.output:
+            write(f)
+    for filename in set(state) - set(f.filename for f in files):
+        if not os.path.exists(filename):
+            del state[filename]
+            changed = True
+    if changed and options.output and options.output != "-":
+        write_all(files)